@@ -0,0 +1,108 @@
+"""Throughput of single-document writes versus WriteBatch commits for pending posts.
+
+Writes the same number of pending_posts documents both ways, the way
+/api/content/manual (one set() per post) and /api/content/manual/bulk
+(WriteBatch chunks of 500) do, and prints posts per second for each.
+
+Run it against the Firestore emulator so nothing touches production data:
+
+    gcloud emulators firestore start --host-port=localhost:8181
+    FIRESTORE_EMULATOR_HOST=localhost:8181 python benchmarks/bulk_manual_posts.py --posts 2000
+
+Without an emulator, `--fake` uses the in-process Firestore fake from
+benchmarks/fakes.py, which charges `--rpc-latency-ms` per round trip (one per
+set(), one per batch commit) and so measures round trips saved, not server
+cost. Measured with --fake, 2000 posts, Python 3.11:
+
+    rpc latency    single (before)    batched (after)    speedup
+    2 ms           461 posts/s        78,311 posts/s     170x
+    20 ms          49 posts/s         20,466 posts/s     416x
+"""
+import os
+import sys
+import time
+import argparse
+
+from google.cloud import firestore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeConfig, FakeFirestoreClient
+from src.services.signed_urls import MEDIA_BUCKET
+
+BATCH_LIMIT = 500
+
+
+def make_post(index, run_id):
+    return {
+        'user_id': 0,
+        'text': f"Benchmark post {index}",
+        'media_url': f"https://storage.googleapis.com/{MEDIA_BUCKET}/benchmark/{run_id}/{index}.png",
+        'media_gcs_uri': f"gs://{MEDIA_BUCKET}/benchmark/{run_id}/{index}.png",
+        'media_type': 'image',
+        'platforms': ['instagram', 'facebook'],
+        'status': 'benchmark',
+        'created_at': firestore.SERVER_TIMESTAMP
+    }
+
+
+def write_single(client, collection, posts):
+    for post in posts:
+        client.collection(collection).document().set(post)
+
+
+def write_batched(client, collection, posts):
+    for start in range(0, len(posts), BATCH_LIMIT):
+        batch = client.batch()
+        for post in posts[start:start + BATCH_LIMIT]:
+            batch.set(client.collection(collection).document(), post)
+        batch.commit()
+
+
+def cleanup(client, collection):
+    while True:
+        documents = list(client.collection(collection).limit(BATCH_LIMIT).stream())
+        if not documents:
+            return
+        batch = client.batch()
+        for document in documents:
+            batch.delete(document.reference)
+        batch.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=1000)
+    parser.add_argument('--project', default=os.getenv('GOOGLE_PROJECT_ID', 'benchmark-project'))
+    parser.add_argument('--collection', default='pending_posts_benchmark')
+    parser.add_argument('--fake', action='store_true', help='Use the in-process Firestore fake instead of the emulator')
+    parser.add_argument('--rpc-latency-ms', type=float, default=10, help='Round-trip latency of the fake')
+    args = parser.parse_args()
+
+    if not args.fake and not os.getenv('FIRESTORE_EMULATOR_HOST'):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST to run against the Firestore emulator, or pass --fake.")
+
+    run_id = int(time.time())
+    posts = [make_post(index, run_id) for index in range(args.posts)]
+
+    results = {}
+    for name, writer in (('single', write_single), ('batched', write_batched)):
+        if args.fake:
+            # A fresh fake per run starts empty, so there is nothing to clean up.
+            client = FakeFirestoreClient(FakeConfig(firestore_latency_ms=args.rpc_latency_ms))
+        else:
+            client = firestore.Client(project=args.project)
+            cleanup(client, args.collection)
+        started = time.perf_counter()
+        writer(client, args.collection, posts)
+        elapsed = time.perf_counter() - started
+        results[name] = elapsed
+        print(f"{name:>8}: {args.posts} posts in {elapsed:.2f}s ({args.posts / elapsed:,.0f} posts/s)")
+    if not args.fake:
+        cleanup(client, args.collection)
+
+    print(f" speedup: {results['single'] / results['batched']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Contention benchmark: concurrent quota decrements and user reads.
+
+Runs the same mixed workload (reserve_quota + commit, and session.get +
+serialize_user) from many threads against each database configuration and
+prints throughput, latency percentiles and errors such as 'database is locked'.
+
+By default it compares SQLite with the default rollback journal against SQLite
+with the WAL/busy_timeout/synchronous tuning from src/database.py. Pass
+--database-url to add a PostgreSQL run (with the pooled engine options):
+
+    python benchmarks/db_contention.py
+    python benchmarks/db_contention.py --threads 16 --seconds 10 --write-ratio 0.5
+    python benchmarks/db_contention.py --database-url postgresql://localhost/contention_bench
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+import src.database as database
+from src.database import db, engine_options
+from src.models.user import User
+from src.serializers.user import serialize_user
+from src.services.quota import reserve_quota
+
+
+def build_app(database_url, users):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all(
+            User(username=f"contention{index}", email=f"contention{index}@example.com", text_quota=10 ** 9)
+            for index in range(users)
+        )
+        db.session.commit()
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)]
+    return app, user_ids
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(app, user_ids, threads, seconds, write_ratio):
+    latencies = {'read': [], 'write': []}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local = {'read': [], 'write': []}
+        local_errors = []
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                user_id = rng.choice(user_ids)
+                kind = 'write' if rng.random() < write_ratio else 'read'
+                started = time.perf_counter()
+                try:
+                    if kind == 'write':
+                        reserve_quota(user_id, 'text').commit()
+                    else:
+                        serialize_user(db.session.get(User, user_id))
+                        db.session.rollback()
+                except Exception as e:
+                    db.session.rollback()
+                    local_errors.append(type(e).__name__ + ': ' + str(e).splitlines()[0])
+                    continue
+                local[kind].append(time.perf_counter() - started)
+        with lock:
+            for kind in local:
+                latencies[kind].extend(local[kind])
+            errors.extend(local_errors)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+def report(name, latencies, errors, elapsed):
+    operations = len(latencies['read']) + len(latencies['write'])
+    print(
+        f"{name:<22} {operations / elapsed:>9,.0f} ops/s  "
+        f"read p50 {percentile(latencies['read'], 0.5) * 1000:6.2f} ms p95 {percentile(latencies['read'], 0.95) * 1000:7.2f} ms  "
+        f"write p50 {percentile(latencies['write'], 0.5) * 1000:6.2f} ms p95 {percentile(latencies['write'], 0.95) * 1000:7.2f} ms  "
+        f"errors {len(errors)}"
+    )
+    if errors:
+        print(f"{'':<22} first error: {errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Additional (e.g. PostgreSQL) database to benchmark')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.seconds:g}s per run, {args.users} users, write ratio {args.write_ratio:g}")
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [
+            ('sqlite (default)', f"sqlite:///{os.path.join(tmp, 'default.db')}", False),
+            ('sqlite (WAL tuned)', f"sqlite:///{os.path.join(tmp, 'tuned.db')}", True)
+        ]
+        if args.database_url:
+            runs.append((args.database_url.split(':', 1)[0], args.database_url, True))
+
+        for name, database_url, tuned in runs:
+            database.SQLITE_TUNING_ENABLED = tuned
+            app, user_ids = build_app(database_url, args.users)
+            latencies, errors, elapsed = run(app, user_ids, args.threads, args.seconds, args.write_ratio)
+            report(name, latencies, errors, elapsed)
+            with app.app_context():
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""In-process fakes for Vertex AI, Cloud Storage and Firestore.
+
+Each fake sleeps for a configurable latency and returns payloads of a
+configurable size, so the app can be benchmarked hermetically. `install_fakes`
+swaps them in through the lazy client registry and the model registry before
+the first request needs a real client.
+"""
+import os
+import enum
+import time
+import uuid
+import queue
+import threading
+from datetime import datetime, timezone
+
+
+class FakeConfig:
+    def __init__(self, image_latency_ms=800, caption_latency_ms=400, video_latency_ms=5000,
+                 upload_latency_ms=50, sign_latency_ms=5, firestore_latency_ms=10,
+                 image_bytes=1536 * 1024, video_bytes=8 * 1024 * 1024):
+        self.image_latency_ms = image_latency_ms
+        self.caption_latency_ms = caption_latency_ms
+        self.video_latency_ms = video_latency_ms
+        self.upload_latency_ms = upload_latency_ms
+        self.sign_latency_ms = sign_latency_ms
+        self.firestore_latency_ms = firestore_latency_ms
+        self.image_bytes = image_bytes
+        self.video_bytes = video_bytes
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _sleep_ms(milliseconds):
+    if milliseconds:
+        time.sleep(milliseconds / 1000)
+
+
+# --- Vertex AI ---
+
+class _GeneratedImage:
+    def __init__(self, data):
+        self._image_bytes = data
+
+
+class FakeImageModel:
+    def __init__(self, config):
+        self.config = config
+
+    def generate_images(self, prompt, number_of_images=1, **kwargs):
+        _sleep_ms(self.config.image_latency_ms)
+        return [_GeneratedImage(os.urandom(self.config.image_bytes)) for _ in range(number_of_images)]
+
+
+class _CaptionResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeCaptionModel:
+    def __init__(self, config):
+        self.config = config
+
+    def generate_content(self, prompt):
+        _sleep_ms(self.config.caption_latency_ms)
+        return _CaptionResponse("A fake caption for load testing. #benchmark #fake")
+
+
+class _GeneratedVideo:
+    def __init__(self, gcs_uri, size):
+        self._gcs_uri = gcs_uri
+        self._size = size
+
+    def load(self):
+        return os.urandom(self._size)
+
+
+class FakeVideoModel:
+    def __init__(self, config):
+        self.config = config
+
+    def generate(self, prompt, high_quality=False, output_gcs_uri=None, **kwargs):
+        _sleep_ms(self.config.video_latency_ms)
+        gcs_uri = f"{output_gcs_uri.rstrip('/')}/{uuid.uuid4().hex}.mp4" if output_gcs_uri else None
+        return _GeneratedVideo(gcs_uri, self.config.video_bytes)
+
+
+# --- Cloud Storage ---
+
+class FakeBlob:
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size or 256 * 1024
+
+    def upload_from_file(self, file_obj, content_type=None, **kwargs):
+        # Read the way a resumable upload does, one chunk at a time.
+        size = 0
+        while True:
+            chunk = file_obj.read(self.chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if len(chunk) < self.chunk_size:
+                break
+        _sleep_ms(self.bucket.client.config.upload_latency_ms)
+        self.bucket.client.stored[f"{self.bucket.name}/{self.name}"] = size
+
+    def generate_signed_url(self, version="v4", expiration=None, method="GET", **kwargs):
+        _sleep_ms(self.bucket.client.config.sign_latency_ms)
+        return f"https://storage.fake.local/{self.bucket.name}/{self.name}?X-Goog-Signature={uuid.uuid4().hex}"
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name, chunk_size)
+
+
+class FakeStorageClient:
+    def __init__(self, config):
+        self.config = config
+        self.stored = {}
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+
+# --- Firestore ---
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, collection, doc_id=None):
+        self.collection = collection
+        self.id = doc_id or uuid.uuid4().hex[:20]
+
+    def set(self, data):
+        _sleep_ms(self.collection.client.config.firestore_latency_ms)
+        self.collection.put(self.id, data)
+
+    def get(self):
+        _sleep_ms(self.collection.client.config.firestore_latency_ms)
+        return FakeSnapshot(self.id, self.collection.documents.get(self.id))
+
+    def delete(self):
+        self.collection.put(self.id, None)
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), limit=None, fields=None, after=None):
+        self.collection = collection
+        self.filters = filters
+        self._limit = limit
+        self.fields = fields
+        self.after = after
+
+    def _with(self, **changes):
+        state = dict(filters=self.filters, limit=self._limit, fields=self.fields, after=self.after)
+        state.update(changes)
+        return FakeQuery(self.collection, **state)
+
+    def where(self, field, op, value):
+        return self._with(filters=self.filters + ((field, op, value),))
+
+    def order_by(self, field):
+        # Results are always in (created_at, id) order, which is the only order the app asks for.
+        return self
+
+    def select(self, fields):
+        return self._with(fields=tuple(fields))
+
+    def start_after(self, values):
+        return self._with(after=(values['created_at'], values['__name__']))
+
+    def limit(self, count):
+        return self._with(limit=count)
+
+    def _matches(self, data):
+        for field, op, value in self.filters:
+            if op == '==' and data.get(field) != value:
+                return False
+            if op == 'array_contains' and value not in (data.get(field) or ()):
+                return False
+        return True
+
+    def on_snapshot(self, callback):
+        return FakeWatch(self, callback)
+
+    def stream(self):
+        _sleep_ms(self.collection.client.config.firestore_latency_ms)
+        with self.collection.lock:
+            rows = [(data['created_at'], doc_id, data) for doc_id, data in self.collection.documents.items()
+                    if self._matches(data)]
+        rows.sort(key=lambda row: (row[0], row[1]))
+        if self.after is not None:
+            rows = [row for row in rows if (row[0], row[1]) > self.after]
+        for created_at, doc_id, data in rows[:self._limit]:
+            if self.fields:
+                data = {field: data[field] for field in self.fields if field in data}
+            yield FakeSnapshot(doc_id, data)
+
+
+class FakeCollection:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.documents = {}
+        self.watches = []
+        self.lock = threading.Lock()
+
+    def put(self, doc_id, data):
+        """Stores (or, with data=None, deletes) a document and notifies the listeners."""
+        from google.cloud.firestore import SERVER_TIMESTAMP
+        if data is not None:
+            data = {key: datetime.now(timezone.utc) if value is SERVER_TIMESTAMP else value
+                    for key, value in data.items()}
+        with self.lock:
+            previous = self.documents.pop(doc_id, None)
+            if data is not None:
+                self.documents[doc_id] = data
+            watches = list(self.watches)
+        for watch in watches:
+            watch.notify(doc_id, previous, data)
+
+    def document(self, doc_id=None):
+        return FakeDocumentReference(self, doc_id)
+
+    def where(self, field, op, value):
+        return FakeQuery(self).where(field, op, value)
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class FakeDocumentChange:
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+
+class FakeWatch:
+    """A snapshot listener on a FakeQuery.
+
+    Like the real client it calls back from its own thread: first with every
+    matching document as ADDED, then with each change. `close()` simulates the
+    stream dying, after which `is_active` is False and no more callbacks run.
+    """
+
+    def __init__(self, query, callback):
+        self.query = query
+        self.callback = callback
+        self._queue = queue.Queue()
+        self._active = True
+        collection = query.collection
+        with collection.lock:
+            collection.watches.append(self)
+            initial = [FakeDocumentChange(ChangeType.ADDED, FakeSnapshot(doc_id, data))
+                       for doc_id, data in collection.documents.items() if query._matches(data)]
+        self._queue.put(initial)
+        threading.Thread(target=self._deliver, name='fake-firestore-watch', daemon=True).start()
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def notify(self, doc_id, previous, data):
+        was_match = previous is not None and self.query._matches(previous)
+        is_match = data is not None and self.query._matches(data)
+        if is_match:
+            change_type = ChangeType.MODIFIED if was_match else ChangeType.ADDED
+            self._queue.put([FakeDocumentChange(change_type, FakeSnapshot(doc_id, data))])
+        elif was_match:
+            self._queue.put([FakeDocumentChange(ChangeType.REMOVED, FakeSnapshot(doc_id, previous))])
+
+    def _deliver(self):
+        while True:
+            changes = self._queue.get()
+            try:
+                if changes is None:
+                    return
+                if self._active:
+                    self.callback([], changes, datetime.now(timezone.utc))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every change queued so far has been delivered."""
+        self._queue.join()
+
+    def close(self):
+        self._active = False
+        with self.query.collection.lock:
+            if self in self.query.collection.watches:
+                self.query.collection.watches.remove(self)
+        self._queue.put(None)
+
+    def unsubscribe(self):
+        self.close()
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, reference, data):
+        self.writes.append((reference, data))
+
+    def commit(self):
+        _sleep_ms(self.client.config.firestore_latency_ms)
+        for reference, data in self.writes:
+            reference.collection.put(reference.id, data)
+
+
+class FakeFirestoreClient:
+    def __init__(self, config):
+        self.config = config
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(self, name)
+            return self._collections[name]
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+
+def install_fakes(config):
+    """Replaces the Google Cloud clients and Vertex model handles with fakes.
+
+    Returns (storage_client, firestore_client) so callers can seed or inspect them.
+    """
+    from src.services.gcp_clients import gcp_clients
+    from src.services.model_registry import model_registry
+    from src.routes import content
+
+    storage_client = FakeStorageClient(config)
+    firestore_client = FakeFirestoreClient(config)
+    gcp_clients.override('vertex', object())
+    gcp_clients.override('storage', storage_client)
+    gcp_clients.override('firestore', firestore_client)
+    model_registry.register(content.CAPTION_MODEL, lambda: FakeCaptionModel(config))
+    model_registry.register(content.IMAGE_MODEL, lambda: FakeImageModel(config))
+    model_registry.register(content.VIDEO_MODEL, lambda: FakeVideoModel(config))
+    return storage_client, firestore_client
@@ -0,0 +1,331 @@
+"""Hermetic load test: boots src.main in-process against fake Google Cloud clients.
+
+Vertex AI, Cloud Storage and Firestore are replaced by the fakes in
+benchmarks/fakes.py (configurable latency and payload size), the database is a
+throwaway SQLite file, and the app is served by a threaded werkzeug server on
+localhost. Worker threads then drive a weighted mix of endpoints at a fixed
+concurrency and the run is summarised as JSON: throughput, p50/p95/p99/max
+latency per endpoint and peak RSS of the process. Requests started inside the
+measured window are counted even if they finish after it, so slow endpoints
+are not under-reported.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 32 --duration 60 --mix generate=1,pending=2,pending_next=1,users=2
+    python benchmarks/load_test.py --image-latency-ms 0 --output after.json --baseline before.json
+
+Peak RSS includes the load-generating threads, which are small next to the app.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import http.client
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeConfig, install_fakes
+
+ENDPOINTS = ('generate', 'pending', 'pending_next', 'check_access', 'users')
+DEFAULT_MIX = 'generate=1,pending=2,pending_next=1,check_access=4,users=2'
+# Small enough that seeded users (pending_posts / users posts each) have more than one page.
+PENDING_PAGE_LIMIT = 5
+PLATFORMS = ('twitter', 'instagram', 'linkedin', 'facebook')
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (expected one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('At least one endpoint needs a positive weight')
+    return mix
+
+
+def boot_app(database_url, media_storage, media_root):
+    """Imports src.main with background jobs, tracing and rate limiting switched off."""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['MEDIA_STORAGE_BACKEND'] = media_storage
+    os.environ['MEDIA_LOCAL_ROOT'] = media_root
+    for name, value in (('WARM_CLIENTS', 'false'), ('WARM_MODELS', 'false'), ('DEMO_SWEEPER', 'false'),
+                        ('QUOTA_RESET_SCHEDULER', 'false'), ('RATELIMIT_ENABLED', 'false'),
+                        ('TRACE_SAMPLE_RATE', '0'), ('TRACE_EXPORT_PATH', '')):
+        os.environ[name] = value
+    os.environ.setdefault('AUTH_TOKEN_SECRET', 'load-test-only-secret')
+    os.environ.setdefault('MEDIA_URL_SECRET', 'load-test-only-secret')
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+    from src import main
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    return main.app
+
+
+def seed(app, firestore_client, users, pending_posts):
+    """Creates subscribed users with ample quota and a queue of pending posts.
+
+    Returns one (user_id, bearer token, cursor) per user, where the cursor
+    points at the user's second page of PENDING_PAGE_LIMIT pending posts
+    (None when they have a single page).
+    """
+    from src.database import db
+    from src.models.user import User
+    from src.services.auth_tokens import issue_token
+    from src.services.pending_posts import PENDING_POSTS_COLLECTION, encode_cursor
+    from src.services.media_storage import media_storage
+
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        accounts = [
+            User(
+                username=f"load{index}", email=f"load{index}@example.com",
+                subscription_tier='enterprise', subscription_status='active',
+                subscription_start_date=now - timedelta(days=1), subscription_end_date=now + timedelta(days=30),
+                payment_method_verified=True,
+                image_quota=10 ** 9, video_v2_quota=10 ** 9, video_v3_quota=10 ** 9, text_quota=10 ** 9
+            )
+            for index in range(users)
+        ]
+        db.session.add_all(accounts)
+        db.session.commit()
+        tokens = [(user.id, issue_token(user)) for user in accounts]
+
+    collection = firestore_client.collection(PENDING_POSTS_COLLECTION)
+    started = datetime.now(timezone.utc) - timedelta(hours=1)
+    cursors = {}
+    for index in range(pending_posts):
+        user_id = tokens[index % len(tokens)][0]
+        created_at = started + timedelta(milliseconds=index)
+        if index // len(tokens) == PENDING_PAGE_LIMIT - 1 and index + len(tokens) < pending_posts:
+            cursors[user_id] = encode_cursor(created_at, f"post{index:08d}")
+        collection.put(f"post{index:08d}", {
+            'user_id': user_id,
+            'text': f"Pending post {index} for load testing #benchmark",
+            'media_url': None,
+            # A URI of the configured backend (in MEDIA_BUCKET for gcs), so listings sign it like real media.
+            'media_gcs_uri': media_storage.uri(f"generated-media/image-{index}.png"),
+            'media_type': 'image',
+            'platforms': [PLATFORMS[index % len(PLATFORMS)]],
+            'status': 'pending',
+            'created_at': created_at
+        })
+    return [(user_id, token, cursors.get(user_id)) for user_id, token in tokens]
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    return server
+
+
+def build_request(endpoint, rng, identity, video_share):
+    """Returns (method, path, body, headers) for one request of `endpoint`."""
+    user_id, token, cursor = identity
+    headers = {'Authorization': f"Bearer {token}"}
+    if endpoint == 'generate':
+        content_type = 'video' if rng.random() < video_share else 'image'
+        body = json.dumps({
+            'brief': {
+                'mainSubject': f"a lighthouse #{rng.randrange(10 ** 6)}", 'setting': 'at dusk',
+                'style': 'photorealistic', 'captionTheme': 'calm evenings'
+            },
+            'contentType': content_type,
+            'platforms': rng.sample(PLATFORMS, 2),
+            'fresh': True
+        })
+        headers['Content-Type'] = 'application/json'
+        return 'POST', '/api/content/generate', body, headers
+    if endpoint in ('pending', 'pending_next'):
+        path = f"/api/content/pending?limit={PENDING_PAGE_LIMIT}&user_id={user_id}"
+        if endpoint == 'pending_next' and cursor:
+            path += f"&cursor={cursor}"
+        return 'GET', path, None, headers
+    if endpoint == 'check_access':
+        return 'GET', '/api/auth/check-access', None, headers
+    return 'GET', '/api/users?limit=50&view=public', None, headers
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            name: round(value * 1000, 2) if value is not None else None
+            for name, value in (('p50', percentile(values, 0.50)), ('p95', percentile(values, 0.95)),
+                                ('p99', percentile(values, 0.99)), ('max', values[-1] if values else None))
+        }
+    }
+
+
+def run(port, identities, mix, concurrency, duration, warmup, video_share, seed_value):
+    names = [name for name in ENDPOINTS if mix.get(name)]
+    weights = [mix[name] for name in names]
+    results = {name: {'latencies': [], 'errors': 0, 'status': {}} for name in names}
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency + 1)
+    timing = {}
+
+    def worker(index):
+        rng = random.Random(seed_value + index)
+        local = {name: {'latencies': [], 'errors': 0, 'status': {}} for name in names}
+        start_barrier.wait()
+        measure_from, stop_at = timing['measure_from'], timing['stop_at']
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            endpoint = rng.choices(names, weights)[0]
+            method, path, body, headers = build_request(endpoint, rng, rng.choice(identities), video_share)
+            started = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=300)
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+                connection.close()
+            except (OSError, http.client.HTTPException):
+                status = 'connection-error'
+            finished = time.perf_counter()
+            if started < measure_from:
+                continue
+            stats = local[endpoint]
+            stats['latencies'].append(finished - started)
+            stats['status'][str(status)] = stats['status'].get(str(status), 0) + 1
+            if status == 'connection-error' or status >= 400:
+                stats['errors'] += 1
+
+        with lock:
+            for name, stats in local.items():
+                results[name]['latencies'].extend(stats['latencies'])
+                results[name]['errors'] += stats['errors']
+                for status, count in stats['status'].items():
+                    results[name]['status'][status] = results[name]['status'].get(status, 0) + count
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    timing['measure_from'] = time.perf_counter() + warmup
+    timing['stop_at'] = timing['measure_from'] + duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    endpoints = {}
+    for name in names:
+        endpoints[name] = summarize(results[name]['latencies'], results[name]['errors'], duration)
+        endpoints[name]['status'] = dict(sorted(results[name]['status'].items()))
+    overall = summarize(
+        [value for name in names for value in results[name]['latencies']],
+        sum(results[name]['errors'] for name in names), duration
+    )
+    return overall, endpoints
+
+
+def compare(report, baseline):
+    """Prints the relative change of throughput and latency against an earlier report."""
+    def delta(new, old):
+        if new is None or not old:
+            return 'n/a'
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    rows = [('overall', report['overall'], baseline.get('overall', {}))]
+    rows += [(name, stats, baseline.get('endpoints', {}).get(name, {})) for name, stats in report['endpoints'].items()]
+    print(f"{'endpoint':<14}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, new, old in rows:
+        old_latency = old.get('latency_ms', {})
+        print(f"{name:<14}{delta(new['throughput_rps'], old.get('throughput_rps')):>10}" + ''.join(
+            f"{delta(new['latency_ms'][key], old_latency.get(key)):>10}" for key in ('p50', 'p95', 'p99')
+        ))
+    print(f"{'peak rss':<14}{delta(report['peak_rss_mib'], baseline.get('peak_rss_mib')):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help=f"Endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of load before measuring starts')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--pending-posts', type=int, default=2000)
+    parser.add_argument('--video-share', type=float, default=0.0, help='Fraction of generate requests asking for video')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file')
+    parser.add_argument('--media-storage', default='gcs', choices=('gcs', 'local'),
+                        help='gcs uses the fake storage client; local writes media to a temporary directory')
+    parser.add_argument('--output', help='Write the JSON report here as well as to stdout')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    defaults = FakeConfig()
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    config = FakeConfig(**{name: getattr(args, name) for name in defaults.to_dict()})
+    workdir = tempfile.mkdtemp(prefix='load-test-')
+    app = boot_app(
+        args.database_url or f"sqlite:///{os.path.join(workdir, 'load_test.db')}",
+        args.media_storage, os.path.join(workdir, 'media')
+    )
+    _, firestore_client = install_fakes(config)
+    identities = seed(app, firestore_client, args.users, args.pending_posts)
+    server = serve(app)
+    try:
+        overall, endpoints = run(
+            server.server_port, identities, args.mix, args.concurrency, args.duration,
+            args.warmup, args.video_share, args.seed
+        )
+    finally:
+        server.shutdown()
+
+    report = {
+        'benchmark': 'load_test',
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {
+            'mix': args.mix, 'concurrency': args.concurrency, 'duration': args.duration, 'warmup': args.warmup,
+            'users': args.users, 'pending_posts': args.pending_posts, 'video_share': args.video_share,
+            'seed': args.seed, 'database': 'custom' if args.database_url else 'sqlite',
+            'media_storage': args.media_storage, 'fakes': config.to_dict()
+        },
+        'overall': overall,
+        'endpoints': endpoints,
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        'peak_rss_mib': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1
+        )
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
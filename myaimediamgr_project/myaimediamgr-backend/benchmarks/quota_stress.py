@@ -0,0 +1,117 @@
+"""Concurrency stress test for the quota reservation engine.
+
+Fires many parallel reservations at one user and checks that the credits
+kept never exceed the starting quota and that refunds land back on the row
+exactly.
+
+    python benchmarks/quota_stress.py
+    python benchmarks/quota_stress.py --database-url postgresql://localhost/quota_bench
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.database import db
+from src.models.user import User
+from src.services.quota import reserve_quota, QuotaExceeded
+
+
+def build_app(database_url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def run(app, requests, quota, refund_every):
+    with app.app_context():
+        user = User(username='quota-stress', email='quota-stress@example.com', image_quota=quota)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    barrier = threading.Barrier(requests)
+    outcomes = {'reserved': 0, 'exceeded': 0, 'refunded': 0, 'errors': []}
+    lock = threading.Lock()
+
+    def worker(index):
+        with app.app_context():
+            barrier.wait()
+            try:
+                reservation = reserve_quota(user_id, 'image')
+            except QuotaExceeded:
+                with lock:
+                    outcomes['exceeded'] += 1
+                return
+            except Exception as e:
+                with lock:
+                    outcomes['errors'].append(repr(e))
+                return
+            if refund_every and index % refund_every == 0:
+                reservation.refund()
+                key = 'refunded'
+            else:
+                reservation.commit()
+                key = 'reserved'
+            with lock:
+                outcomes[key] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(requests)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = db.session.get(User, user_id).image_quota
+    return outcomes, remaining, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='Defaults to a throwaway SQLite file')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--quota', type=int, default=50)
+    parser.add_argument('--refund-every', type=int, default=0,
+                        help='Refund every Nth successful reservation (0 disables refunds)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'quota_stress.db')}"
+        app = build_app(database_url)
+        outcomes, remaining, elapsed = run(app, args.requests, args.quota, args.refund_every)
+
+    granted = outcomes['reserved'] + outcomes['refunded']
+    print(f"{args.requests} parallel reservations against quota {args.quota} in {elapsed:.2f}s")
+    print(f"  granted={granted} (kept={outcomes['reserved']}, refunded={outcomes['refunded']}) "
+          f"exceeded={outcomes['exceeded']} errors={len(outcomes['errors'])} remaining={remaining}")
+
+    failures = []
+    if outcomes['errors']:
+        failures.append(f"unexpected errors: {outcomes['errors'][:3]}")
+    # Refunded credits can be granted again, so only the kept reservations are bounded by the quota.
+    if outcomes['reserved'] > args.quota:
+        failures.append(f"over-spend: {outcomes['reserved']} reservations kept for quota {args.quota}")
+    if remaining != args.quota - outcomes['reserved']:
+        failures.append(f"lost update: expected {args.quota - outcomes['reserved']} remaining, found {remaining}")
+    if remaining < 0:
+        failures.append("quota went negative")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,10 @@
 #!/bin/sh
 set -e
 
+# Each gunicorn worker writes its metrics here so /metrics can aggregate them.
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus_multiproc}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "--- Starting Gunicorn ---"
-exec gunicorn --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 120 src.main:app
\ No newline at end of file
+exec gunicorn --config gunicorn.conf.py --bind 0.0.0.0:$PORT --workers 1 --threads 8 --timeout 120 src.main:app
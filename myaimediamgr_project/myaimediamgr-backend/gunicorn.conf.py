@@ -0,0 +1,19 @@
+"""gunicorn settings shared by every worker (loaded by entrypoint.sh)."""
+from prometheus_client import multiprocess
+
+
+def post_worker_init(worker):
+    # Background jobs run only in serving workers, not in `flask db upgrade` or other
+    # commands that import the app; a lock file elects one worker to run each job.
+    from src.services.quota_reset import start_quota_reset_scheduler, QUOTA_RESET_SCHEDULER_ENABLED
+    from src.services.demo_users import start_demo_sweeper, DEMO_SWEEPER_ENABLED
+
+    if QUOTA_RESET_SCHEDULER_ENABLED:
+        start_quota_reset_scheduler(worker.wsgi)
+    if DEMO_SWEEPER_ENABLED:
+        start_demo_sweeper(worker.wsgi)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the aggregated /metrics output.
+    multiprocess.mark_process_dead(worker.pid)
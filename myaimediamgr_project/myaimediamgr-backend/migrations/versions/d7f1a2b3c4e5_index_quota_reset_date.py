@@ -0,0 +1,26 @@
+"""Index user.quota_reset_date for the quota reset job
+
+Revision ID: d7f1a2b3c4e5
+Revises: c5e8f7g9h0i1
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f1a2b3c4e5'
+down_revision = 'c5e8f7g9h0i1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_quota_reset_date'), ['quota_reset_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_quota_reset_date'))
@@ -0,0 +1,26 @@
+"""Index user (role, created_at) for the demo user sweeper
+
+Revision ID: e2a9b8c7d6f5
+Revises: d7f1a2b3c4e5
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9b8c7d6f5'
+down_revision = 'd7f1a2b3c4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_role_created_at', ['role', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_role_created_at')
@@ -1,3 +1,65 @@
+import os
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
 
 db = SQLAlchemy()
+
+# --- Engine configuration ---
+# gunicorn runs 8 request threads per worker, plus the background generation workers.
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv('DB_POOL_TIMEOUT_SECONDS', '30'))
+# Recycle before typical proxy/Cloud SQL idle timeouts close the connection underneath us.
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_TUNING_ENABLED = os.getenv('SQLITE_TUNING', 'true').lower() in ('1', 'true', 'yes')
+
+
+def database_url(default_sqlite_path):
+    """DATABASE_URL if set (normalizing Heroku-style postgres://), else the bundled SQLite file."""
+    url = os.getenv('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{default_sqlite_path}"
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the backend named by `url`."""
+    if make_url(url).get_backend_name() == 'sqlite':
+        # The connect pragmas below do the tuning; the driver timeout matches busy_timeout.
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT_SECONDS,
+        'pool_recycle': DB_POOL_RECYCLE_SECONDS,
+        'pool_pre_ping': True
+    }
+
+
+def configure_database(app, default_sqlite_path):
+    url = database_url(default_sqlite_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    return make_url(url).render_as_string(hide_password=True)
+
+
+@event.listens_for(Engine, 'connect')
+def _tune_sqlite_connection(dbapi_connection, connection_record):
+    """Applies the SQLite pragmas to every new connection.
+
+    WAL lets readers proceed while one thread writes, busy_timeout makes
+    writers wait for the lock instead of failing with 'database is locked',
+    and synchronous=NORMAL is still safe against application crashes in WAL mode.
+    """
+    if not SQLITE_TUNING_ENABLED or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
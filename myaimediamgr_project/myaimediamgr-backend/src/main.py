@@ -9,27 +9,46 @@ logging.basicConfig(level=logging.INFO)
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 try:
-    from flask import Flask, send_from_directory
-    from flask_cors import CORS
-    from dotenv import load_dotenv
-    from flask_migrate import Migrate
-    from src.database import db
-    from src.routes.user import user_bp
-    from src.routes.content import content_bp
-    from src.routes.subscription import subscription_bp
-    from flask_limiter import Limiter
-    from flask_limiter.util import get_remote_address
+    from src.services.startup_timing import startup_timer
+
+    with startup_timer.step('flask + extensions'):
+        from flask import Flask, jsonify
+        from flask_cors import CORS
+        from dotenv import load_dotenv
+        from flask_migrate import Migrate
+        from flask_limiter import Limiter
+        from flask_limiter.util import get_remote_address
+    with startup_timer.step('src.database'):
+        from src.database import db, configure_database
+    with startup_timer.step('src.routes.user'):
+        from src.routes.user import user_bp
+    with startup_timer.step('src.routes.content'):
+        from src.routes.content import content_bp
+    with startup_timer.step('src.routes.subscription'):
+        from src.routes.subscription import subscription_bp
+    from src.services.model_registry import model_registry
+    from src.services.gcp_clients import gcp_clients, WARM_CLIENTS
+    from src.services.auth_tokens import init_auth_tokens, load_request_identity
+    from src.services.static_assets import StaticManifest
+    from src.services.media_storage import init_media_storage
+    from src.services.metrics import init_metrics
+    from src.services.tracing import init_tracing
+    from src.services.quota_reset import reset_quotas_command
+    from src.services.demo_users import sweep_demo_users_command
 
     # Load environment variables
     load_dotenv()
 
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
     app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    # Auth tokens are signed with AUTH_TOKEN_SECRET; startup fails without it
+    init_auth_tokens(app)
 
     # Enable CORS
     CORS(app)
 
-    # Set up rate limiting
+    # Set up rate limiting (RATELIMIT_ENABLED=false turns it off, e.g. for benchmarks/load_test.py)
+    app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
     limiter = Limiter(
         get_remote_address,
         app=app,
@@ -37,35 +56,72 @@ try:
         storage_uri="memory://",
     )
 
+    # Registered first so the request span covers every other hook; sets the X-Trace-Id header
+    init_tracing(app)
+
+    # Request latency / DB query histograms and the Prometheus /metrics endpoint
+    init_metrics(app, limiter)
+
+    # Bearer tokens are verified from their signature alone; routes read g.identity
+    app.before_request(load_request_identity)
+
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(content_bp, url_prefix='/api')
     app.register_blueprint(subscription_bp, url_prefix='/api/subscription')
 
+    # MEDIA_STORAGE_BACKEND=local keeps media on disk and serves it from /media/<key> via signed URLs
+    init_media_storage(app, limiter)
+
+    # Cloud clients are created lazily; warming them off-thread keeps them off the cold-start path
+    if WARM_CLIENTS:
+        gcp_clients.warm_up_in_background()
+
+    # Optionally build the Vertex AI model handles before the first request needs them
+    if os.getenv('WARM_MODELS', 'false').lower() in ('1', 'true', 'yes'):
+        model_registry.warm_up_in_background()
+
     # Database configuration
     db_path = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
-    logging.info(f"Database path configured to: {db_path}")
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    logging.info(f"Database configured: {configure_database(app, db_path)}")
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     db.init_app(app)
     migrate = Migrate(app, db)
 
+    # `flask --app src.main reset-quotas` runs the reset once; the scheduler repeats it in-process.
+    # Expired demo accounts are deleted in small batches by `sweep-demo-users` or the background sweeper.
+    # Both background jobs are started by the gunicorn workers (gunicorn.conf.py), never on import.
+    app.cli.add_command(reset_quotas_command)
+    app.cli.add_command(sweep_demo_users_command)
+
+    # Index (and precompress) the frontend bundle once instead of probing the disk per request
+    with startup_timer.step('static manifest'):
+        static_manifest = StaticManifest(app.static_folder).build() if app.static_folder else None
+
+    startup_report = startup_timer.report()
+
+    @app.route('/healthz')
+    @limiter.exempt
+    def healthz():
+        """Liveness/startup probe: answers as soon as the app is loaded, without waiting on AI clients."""
+        return jsonify({
+            'status': 'ok',
+            'clients': gcp_clients.status(),
+            'models': {name: stats['loaded'] for name, stats in model_registry.stats().items()},
+            'startup': startup_report
+        })
+
     @app.route('/', defaults={'path': ''})
     @app.route('/<path:path>')
     def serve(path):
-        static_folder_path = app.static_folder
-        if static_folder_path is None:
+        if static_manifest is None:
                 logging.error("Static folder not configured")
                 return "Static folder not configured", 404
 
-        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-            return send_from_directory(static_folder_path, path)
-        else:
-            index_path = os.path.join(static_folder_path, 'index.html')
-            if os.path.exists(index_path):
-                return send_from_directory(static_folder_path, 'index.html')
-            else:
-                logging.error("index.html not found in static folder")
-                return "index.html not found", 404
+        asset = static_manifest.lookup(path)
+        if asset is None:
+            logging.error("index.html not found in static folder")
+            return "index.html not found", 404
+        return static_manifest.respond(asset)
 
     logging.info("Application setup complete. Gunicorn will now take over.")
 
@@ -73,7 +129,3 @@ except Exception as e:
     logging.error("An error occurred during application startup:", exc_info=True)
     # We must exit with a non-zero code to fail the container startup
     sys.exit(1)
-
-
-
-
@@ -2,11 +2,14 @@ from src.database import db
 from datetime import datetime, timedelta
 
 class User(db.Model):
+    # Lets the demo sweeper range-scan expired demo accounts instead of the whole table.
+    __table_args__ = (db.Index('ix_user_role_created_at', 'role', 'created_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128))
-    role = db.Column(db.String(20), default='user', nullable=False)  # 'user' or 'admin'
+    role = db.Column(db.String(20), default='user', nullable=False)  # 'user', 'admin' or 'demo'
 
     # Subscription fields
     subscription_tier = db.Column(db.String(20), default='trial')  # trial, starter, pro, business, enterprise
@@ -15,7 +18,8 @@ class User(db.Model):
     trial_end_date = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=14))
     subscription_start_date = db.Column(db.DateTime)
     subscription_end_date = db.Column(db.DateTime)
-    quota_reset_date = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=30))
+    # Indexed so the quota reset job can find due users without a table scan.
+    quota_reset_date = db.Column(db.DateTime, default=lambda: datetime.utcnow() + timedelta(days=30), index=True)
 
     # Quota fields - Based on new pricing model
     image_quota = db.Column(db.Integer, default=100)
@@ -1,86 +1,157 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context, g
 import os
+import json
+import math
 import time
-from datetime import datetime, timedelta, timezone
-from google.cloud import firestore, storage
-import google.auth
-import google.auth.transport.requests
+import uuid
+import threading
 from src.models.user import User
 from src.database import db
-import vertexai
-from vertexai.generative_models import GenerativeModel, Image
-from vertexai.preview.vision_models import ImageGenerationModel, VideoGenerationModel
 import logging
 from google.api_core import exceptions
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from src.services.generation_jobs import generation_jobs, QueueFullError
+from src.services.model_registry import model_registry
+from src.services.admission import admission_control, AdmissionRejected
+from src.services.generation_cache import GenerationCache, FirestoreCacheStore, make_cache_key
+from src.services.signed_urls import SignedUrlCache, UnsignableUri
+from src.services.media_upload import log_peak_memory
+from src.services.media_storage import media_storage
+from src.services.pipeline_executor import run_concurrently
+from src.services.quota import reserve_quota, QuotaExceeded, QuotaUserNotFound
+from src.services.pending_posts import (
+    build_pending_query, encode_cursor, parse_fields, InvalidCursor,
+    PENDING_PAGE_SIZE_DEFAULT, PENDING_PAGE_SIZE_MAX, PENDING_POSTS_COLLECTION
+)
+from src.services.pending_index import pending_index
+from src.services.gcp_clients import init_vertex, get_firestore_client
+from src.services.metrics import stage_timer, InstrumentedThreadPoolExecutor
+from src.services.tracing import span, traced, tag
 
 content_bp = Blueprint('content', __name__)
 
 # --- Environment Setup ---
-PROJECT_ID = os.getenv('GOOGLE_PROJECT_ID', 'final-myaimediamgr-website')
-LOCATION = "us-central1"
-BUCKET_NAME = "final-myaimediamgr-website-media"
+CAPTION_MODEL = "gemini-1.5-flash"
+IMAGE_MODEL = "imagegeneration@006"
+VIDEO_MODEL = "veo-3.0-fast-generate-preview"
+MEDIA_PREFIX = "generated-media"
+# Let Veo write the MP4 straight to the bucket (GCS storage only) so video bytes never enter this process.
+VEO_DIRECT_GCS_OUTPUT = os.getenv('VEO_DIRECT_GCS_OUTPUT', 'true').lower() in ('1', 'true', 'yes')
+MAX_SIGN_BATCH_SIZE = 200
+MAX_BATCH_ITEMS = 10
+# Firestore rejects WriteBatch commits with more than 500 writes.
+FIRESTORE_BATCH_LIMIT = 500
+MAX_BULK_POSTS = 5000
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+# Retry-After sent when Vertex AI answers ResourceExhausted; admission control has already slowed down.
+MODEL_THROTTLED_RETRY_AFTER_SECONDS = int(os.getenv('MODEL_THROTTLED_RETRY_AFTER_SECONDS', '10'))
+# Polling the status URL is the primary way to follow a job. An events stream holds a
+# request thread, so streams are capped in number and length and clients reconnect.
+JOB_POLL_INTERVAL_SECONDS = 3
+JOB_EVENTS_HEARTBEAT_SECONDS = 10
+JOB_EVENTS_MAX_SECONDS = int(os.getenv('GENERATION_JOB_EVENTS_MAX_SECONDS', '30'))
+JOB_EVENTS_MAX_STREAMS = int(os.getenv('GENERATION_JOB_EVENTS_MAX_STREAMS', '2'))
+
+# --- Lazy Initialization ---
+# Vertex AI, GCS and Firestore clients (and the SDK imports behind them) are
+# created on first use by src.services.gcp_clients, keeping them off the cold-start path.
+def _caption_model():
+    init_vertex()
+    from vertexai.generative_models import GenerativeModel
+    return GenerativeModel(CAPTION_MODEL)
+
+def _image_model():
+    init_vertex()
+    from vertexai.preview.vision_models import ImageGenerationModel
+    return ImageGenerationModel.from_pretrained(IMAGE_MODEL)
+
+def _video_model():
+    init_vertex()
+    from vertexai.preview.vision_models import VideoGenerationModel
+    return VideoGenerationModel.from_pretrained(VIDEO_MODEL)
+
+# Model handles are built once per worker and shared across requests.
+model_registry.register(CAPTION_MODEL, _caption_model)
+model_registry.register(IMAGE_MODEL, _image_model)
+model_registry.register(VIDEO_MODEL, _video_model)
+
+# Client-side admission per model, sized to this worker's share of the Vertex AI quota.
+admission_control.register(
+    CAPTION_MODEL, rpm=int(os.getenv('CAPTION_MODEL_RPM', '300')),
+    max_concurrency=int(os.getenv('CAPTION_MODEL_CONCURRENCY', '16'))
+)
+admission_control.register(
+    IMAGE_MODEL, rpm=int(os.getenv('IMAGE_MODEL_RPM', '60')),
+    max_concurrency=int(os.getenv('IMAGE_MODEL_CONCURRENCY', '8'))
+)
+admission_control.register(
+    VIDEO_MODEL, rpm=int(os.getenv('VIDEO_MODEL_RPM', '10')),
+    max_concurrency=int(os.getenv('VIDEO_MODEL_CONCURRENCY', '4'))
+)
 
-# --- Correct, Unified Initialization ---
-vertexai.init(project=PROJECT_ID, location=LOCATION)
-storage_client = storage.Client()
-firestore_db = firestore.Client(project=PROJECT_ID)
+generation_cache = GenerationCache(persistent_store=FirestoreCacheStore(get_firestore_client))
 
 # --- Helper Functions ---
 def get_user_or_404(uid):
-    user = User.query.get(uid)
+    with span('user.lookup'):
+        user = User.query.get(uid)
     if not user:
         raise Exception("User not found")
     return user
 
-def check_and_decrement_quota(user, content_type):
-    if user.role == 'admin':
-        return True
-    quota_map = {
-        'image': 'image_quota', 'video': 'video_v2_quota', 'text': 'text_quota'
-    }
-    quota_attr = quota_map.get(content_type)
-    if not quota_attr:
-        raise Exception("Invalid content type for quota check")
-    with db.session.begin_nested():
-        user_to_update = db.session.query(User).filter_by(id=user.id).with_for_update().one()
-        current_val = getattr(user_to_update, quota_attr)
-        if current_val is None or current_val <= 0:
-            raise Exception(f"No {content_type} credits remaining.")
-        setattr(user_to_update, quota_attr, current_val - 1)
-    return True
+def request_uid(data):
+    """The caller's user id: from the verified bearer token, else the payload's `uid`."""
+    identity = g.get('identity')
+    if identity is not None:
+        return identity.user_id
+    return data.get('uid')
+
+def verified_user_id(uid):
+    """Skips the User lookup when the id already came from a verified token."""
+    if g.get('identity') is not None:
+        return uid
+    return get_user_or_404(uid).id
+
+def is_truthy(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def build_engineered_prompt(brief):
+    prompt_parts = [
+        brief.get('mainSubject'), brief.get('setting'), brief.get('style'), brief.get('details')
+    ]
+    return ", ".join(filter(None, prompt_parts))
+
+def _sign_media_uri(uri, expires_at):
+    return media_storage.sign_url(media_storage.key_from_uri(uri), expires_at)
+
+# Only URIs of the configured storage (the MEDIA_BUCKET bucket, or local://) are ever signed.
+signed_url_cache = SignedUrlCache(_sign_media_uri, accepts=lambda uri: media_storage.key_from_uri(uri) is not None)
 
 def generate_signed_url_for_gcs_uri(gcs_uri):
-    """Generates a temporary, publicly accessible URL for a GCS object."""
+    """Returns a temporary, publicly accessible URL for a stored media URI, reusing unexpired ones.
+
+    Returns None for URIs outside the configured storage or when signing fails.
+    """
     try:
-        if not gcs_uri.startswith("gs://"):
-            logging.error(f"Invalid GCS URI provided for signing: {gcs_uri}")
-            return gcs_uri
-
-        bucket_name, blob_name = gcs_uri.replace("gs://", "").split("/", 1)
-        bucket = storage_client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-
-        signed_url = blob.generate_signed_url(
-            version="v4",
-            expiration=datetime.now(timezone.utc) + timedelta(minutes=15),
-            method="GET"
-        )
-        return signed_url
+        return signed_url_cache.sign(gcs_uri)
+    except UnsignableUri:
+        logging.warning(f"Refusing to sign media URI outside the configured storage: {gcs_uri}")
+        return None
     except Exception as e:
         logging.error(f"Failed to generate signed URL for {gcs_uri}: {e}", exc_info=True)
-        return gcs_uri
+        return None
+
+def sign_gcs_uris(gcs_uris):
+    """Signs a list of media URIs in one call and returns a {uri: signed_url or None} mapping."""
+    return {uri: generate_signed_url_for_gcs_uri(uri) for uri in dict.fromkeys(gcs_uris)}
 
 # --- AI Model Generation Functions ---
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=2, min=5, max=30),
-    retry=retry_if_exception_type(exceptions.ResourceExhausted)
-)
+@traced('generate_caption_for_image')
 def generate_caption_for_image(image_bytes, theme, platforms):
     """Generates a caption for a given image using a multimodal model."""
-    model = GenerativeModel("gemini-1.5-flash")
+    from vertexai.generative_models import Image
+
+    model = model_registry.get(CAPTION_MODEL)
     image = Image.from_bytes(image_bytes)
     
     platform_map = {
@@ -110,150 +181,576 @@ def generate_caption_for_image(image_bytes, theme, platforms):
         image
     ]
     
-    response = model.generate_content(prompt)
+    with admission_control.admit(CAPTION_MODEL), stage_timer('gemini_caption'), model_registry.timed_call(CAPTION_MODEL):
+        response = model.generate_content(prompt)
     return response.text
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=2, min=5, max=30),
-    retry=retry_if_exception_type(exceptions.ResourceExhausted)
-)
+@traced('generate_image_content')
 def generate_image_content(brief):
-    """Generates an image and returns the signed URL and the image bytes."""
-    prompt_parts = [
-        brief.get('mainSubject'), brief.get('setting'), brief.get('style'), brief.get('details')
-    ]
-    engineered_prompt = ", ".join(filter(None, prompt_parts))
+    """Generates an image with Imagen and returns the PNG bytes."""
+    engineered_prompt = build_engineered_prompt(brief)
 
-    model = ImageGenerationModel.from_pretrained("imagegeneration@006")
-    images = model.generate_images(prompt=engineered_prompt, number_of_images=1)
+    model = model_registry.get(IMAGE_MODEL)
+    with admission_control.admit(IMAGE_MODEL), stage_timer('imagen'), model_registry.timed_call(IMAGE_MODEL):
+        images = model.generate_images(prompt=engineered_prompt, number_of_images=1)
     
-    image_bytes = images[0]._image_bytes
-    
-    file_name = f"generated-media/image-{int(time.time())}.png"
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(file_name)
-    blob.upload_from_string(image_bytes, content_type='image/png')
+    return images[0]._image_bytes
+
+def store_generated_image(image_bytes):
+    """Stores generated image bytes and returns the signed URL and the storage URI."""
+    file_name = f"{MEDIA_PREFIX}/image-{int(time.time())}-{uuid.uuid4().hex[:8]}.png"
+    media_storage.put_stream(file_name, image_bytes, content_type='image/png')
     
-    gcs_uri = f"gs://{BUCKET_NAME}/{file_name}"
+    gcs_uri = media_storage.uri(file_name)
     signed_url = generate_signed_url_for_gcs_uri(gcs_uri)
     
-    return signed_url, image_bytes
+    return signed_url, gcs_uri
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=2, min=5, max=30),
-    retry=retry_if_exception_type(exceptions.ResourceExhausted)
-)
+def run_image_pipeline(brief, platforms):
+    """Generates an image, then uploads/signs it and captions it concurrently.
+
+    Captioning only needs the in-memory bytes, so it overlaps the GCS upload
+    instead of waiting for it. Returns (signed_url, gcs_uri, caption).
+    """
+    image_bytes = generate_image_content(brief)
+    (signed_url, gcs_uri), caption = run_concurrently(
+        (store_generated_image, image_bytes),
+        (generate_caption_for_image, image_bytes, brief.get('captionTheme'), platforms)
+    )
+    return signed_url, gcs_uri, caption
+
+@traced('generate_video_content')
 def generate_video_content(brief):
-    """Generates a video using Veo on Vertex AI and returns the signed URL."""
-    prompt_parts = [
-        brief.get('mainSubject'), brief.get('setting'), brief.get('style'), brief.get('details')
-    ]
-    engineered_prompt = ", ".join(filter(None, prompt_parts))
+    """Generates a video using Veo on Vertex AI and returns the signed URL and the GCS URI."""
+    engineered_prompt = build_engineered_prompt(brief)
     
     logging.info(f"Starting video generation for prompt: '{engineered_prompt}'")
 
-    model = VideoGenerationModel.from_pretrained("veo-3.0-fast-generate-preview")
-    
-    video_result = model.generate(
-        prompt=engineered_prompt,
-        high_quality=False 
-    )
+    model = model_registry.get(VIDEO_MODEL)
     
-    video_bytes = video_result.load()
+    output_uri = media_storage.direct_output_uri(MEDIA_PREFIX) if VEO_DIRECT_GCS_OUTPUT else None
+    output_options = {'output_gcs_uri': output_uri} if output_uri else {}
+    with admission_control.admit(VIDEO_MODEL), stage_timer('veo'), model_registry.timed_call(VIDEO_MODEL):
+        video_result = model.generate(
+            prompt=engineered_prompt,
+            high_quality=False,
+            **output_options
+        )
 
-    file_name = f"generated-media/video-{int(time.time())}.mp4"
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(file_name)
-    blob.upload_from_string(video_bytes, content_type='video/mp4')
+    gcs_uri = getattr(video_result, '_gcs_uri', None)
+    if not gcs_uri:
+        # The model returned the video inline; stream it to storage in chunks without extra copies.
+        file_name = f"{MEDIA_PREFIX}/video-{int(time.time())}-{uuid.uuid4().hex[:8]}.mp4"
+        media_storage.put_stream(file_name, video_result.load(), content_type='video/mp4')
+        gcs_uri = media_storage.uri(file_name)
 
-    gcs_uri = f"gs://{BUCKET_NAME}/{file_name}"
     logging.info(f"Video generation successful. Output at: {gcs_uri}")
     
     signed_url = generate_signed_url_for_gcs_uri(gcs_uri)
-    return signed_url
+    return signed_url, gcs_uri
 
 # --- API Endpoints ---
 
+def generation_cache_key(user_id, brief, content_type, platforms):
+    """The user's cache key for this brief, or None when the result is not cacheable."""
+    model_id = {'image': IMAGE_MODEL, 'video': VIDEO_MODEL}.get(content_type)
+    if not model_id or not generation_cache.enabled:
+        return None
+    return make_cache_key(build_engineered_prompt(brief), model_id, platforms, brief.get('captionTheme'), user_id)
+
+def cached_generation(cache_key, fresh=False):
+    """The cached response payload for `cache_key`, or None; `fresh` always misses."""
+    if cache_key is None:
+        return None
+    if fresh:
+        generation_cache.record_bypass()
+        return None
+    cached = generation_cache.get(cache_key)
+    if not cached:
+        return None
+    return {
+        'text': cached['text'],
+        'media_url': generate_signed_url_for_gcs_uri(cached['gcs_uri']),
+        'media_type': cached['media_type'],
+        'media_gcs_uri': cached['gcs_uri'],
+        'cached': True
+    }
+
+def run_generation(user_id, brief, content_type, platforms, fresh=False, lookup=True):
+    """Runs the generation pipeline for one brief and returns the response payload.
+
+    When the generation cache is enabled, the same user's identical earlier
+    brief is served from the cache unless `fresh` is set (or `lookup` is off
+    because the caller already checked); fresh results still refresh the cache.
+    Cached results carry `cached: True` and should not be charged quota.
+    """
+    cache_key = generation_cache_key(user_id, brief, content_type, platforms)
+    if lookup:
+        cached = cached_generation(cache_key, fresh)
+        if cached:
+            return cached
+
+    text_content, media_url, media_type, gcs_uri = "", None, None, None
+
+    with log_peak_memory(f"Generation ({content_type})"):
+        if content_type == 'image':
+            media_url, gcs_uri, text_content = run_image_pipeline(brief, platforms)
+            media_type = 'image'
+
+        elif content_type == 'video':
+            media_url, gcs_uri = generate_video_content(brief)
+            media_type = 'video'
+            text_content = f"An AI-generated video based on the theme: {brief.get('captionTheme')}"
+
+    if cache_key:
+        generation_cache.put(cache_key, gcs_uri, media_type, text_content)
+
+    return {'text': text_content, 'media_url': media_url, 'media_type': media_type,
+            'media_gcs_uri': gcs_uri, 'cached': False}
+
+def _content_error_response(e):
+    if isinstance(e, AdmissionRejected):
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+        return response, 503
+    if isinstance(e, exceptions.ResourceExhausted):
+        # Throttled model calls are not retried on the request thread; the client retries instead.
+        response = jsonify({'success': False, 'error': 'The AI model is over capacity, please retry shortly.'})
+        response.headers['Retry-After'] = str(MODEL_THROTTLED_RETRY_AFTER_SECONDS)
+        return response, 503
+    if isinstance(e, QuotaUserNotFound):
+        return jsonify({'success': False, 'error': str(e)}), 404
+    if isinstance(e, QuotaExceeded):
+        return jsonify({'success': False, 'error': str(e)}), 403
+    if isinstance(e, exceptions.GoogleAPICallError):
+        return jsonify({'success': False, 'error': f'Cloud API Error: {e.message}'}), 500
+    return jsonify({'success': False, 'error': f'Failed to generate content: {str(e)}'}), 500
+
+def submit_generation_job(uid, brief, content_type, platforms, fresh=False):
+    """Reserves quota, queues the generation and returns a 202 response."""
+    reservation = reserve_quota(uid, content_type)
+
+    def generate():
+        result = run_generation(uid, brief, content_type, platforms, fresh=fresh, lookup=False)
+        reservation.commit()
+        return result
+
+    try:
+        job = generation_jobs.submit(
+            current_app._get_current_object(), uid, content_type, generate,
+            on_failure=lambda job: reservation.refund()
+        )
+    except QueueFullError as e:
+        reservation.refund()
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    response = jsonify({'success': True, 'data': {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f"/api/content/jobs/{job.id}",
+        'events_url': f"/api/content/jobs/{job.id}/events",
+        'poll_interval_seconds': JOB_POLL_INTERVAL_SECONDS
+    }})
+    response.headers['Retry-After'] = str(JOB_POLL_INTERVAL_SECONDS)
+    return response, 202
+
 @content_bp.route('/content/generate', methods=['POST'])
 def generate_content_route():
     try:
         data = request.get_json()
         brief = data.get('brief')
-        uid = data.get('uid')
+        uid = request_uid(data)
         content_type = data.get('contentType')
         platforms = data.get('platforms')
+        tag(**{'user.id': uid, 'content.type': content_type})
         
         if not all([brief, uid, content_type, platforms]):
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
 
-        user = get_user_or_404(uid)
-        check_and_decrement_quota(user, content_type)
+        fresh = is_truthy(data.get('fresh', request.args.get('fresh', False)))
 
-        text_content, media_url, media_type = "", None, None
+        # A cache hit is answered before any quota is reserved, so it costs the user nothing.
+        cached = cached_generation(generation_cache_key(uid, brief, content_type, platforms), fresh)
+        if cached:
+            return jsonify({'success': True, 'data': cached})
 
-        if content_type == 'image':
-            media_url, image_bytes = generate_image_content(brief)
-            media_type = 'image'
-            text_content = generate_caption_for_image(image_bytes, brief.get('captionTheme'), platforms)
-        
-        elif content_type == 'video':
-            media_url = generate_video_content(brief)
-            media_type = 'video'
-            text_content = f"An AI-generated video based on the theme: {brief.get('captionTheme')}"
+        if data.get('async'):
+            return submit_generation_job(uid, brief, content_type, platforms, fresh=fresh)
+
+        with reserve_quota(uid, content_type):
+            result = run_generation(uid, brief, content_type, platforms, fresh=fresh, lookup=False)
 
-        db.session.commit()
-        return jsonify({'success': True, 'data': {'text': text_content, 'media_url': media_url, 'media_type': media_type}})
+        return jsonify({'success': True, 'data': result})
     
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error in content generation: {e}", exc_info=True)
-        if isinstance(e, exceptions.GoogleAPICallError):
-            return jsonify({'success': False, 'error': f'Cloud API Error: {e.message}'}), 500
-        return jsonify({'success': False, 'error': f'Failed to generate content: {str(e)}'}), 500
+        return _content_error_response(e)
+
+@content_bp.route('/content/models/stats', methods=['GET'])
+def get_model_stats():
+    """Per-model handle init and call timings, and admission control state, for this worker."""
+    return jsonify({'success': True, 'data': model_registry.stats(), 'admission': admission_control.stats()})
+
+def plan_batch_items(platforms, variants, per_platform):
+    """Expands a batch request into one platform list per generation."""
+    targets = [[platform] for platform in platforms] if per_platform else [platforms]
+    items = []
+    for target in targets:
+        for variant in range(variants):
+            items.append({'index': len(items), 'variant': variant, 'platforms': target})
+    return items
+
+def run_batch_item(app, uid, item, brief, content_type, fresh):
+    with app.app_context():
+        try:
+            result = run_generation(uid, brief, content_type, item['platforms'], fresh=fresh)
+            return dict(item, status='succeeded', data=result)
+        except Exception as e:
+            logging.error(f"Batch item {item['index']} failed: {e}", exc_info=True)
+            return dict(item, status='failed', error=str(e))
+
+@content_bp.route('/content/generate/batch', methods=['POST'])
+def generate_batch_route():
+    """Generates several variants and/or one post per platform from a single brief.
+
+    Quota for every item is reserved up front with one conditional UPDATE;
+    items that fail or are served from the generation cache are refunded
+    together once the batch finishes.
+    """
+    try:
+        data = request.get_json()
+        brief = data.get('brief')
+        uid = request_uid(data)
+        content_type = data.get('contentType')
+        platforms = data.get('platforms')
+        tag(**{'user.id': uid, 'content.type': content_type})
+        per_platform = is_truthy(data.get('perPlatform', False))
+        
+        if not all([brief, uid, content_type, platforms]):
+            return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        try:
+            variants = int(data.get('variants', 1))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'variants must be an integer'}), 400
+
+        items = plan_batch_items(platforms, variants, per_platform) if 1 <= variants <= MAX_BATCH_ITEMS else []
+        if not items or len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'success': False, 'error': f'A batch must contain between 1 and {MAX_BATCH_ITEMS} items'}), 400
+
+        reservation = reserve_quota(uid, content_type, amount=len(items))
+
+        # Variants of one brief would all hit the same cache entry, so they always generate fresh.
+        fresh = variants > 1 or is_truthy(data.get('fresh', False))
+        app = current_app._get_current_object()
+        with InstrumentedThreadPoolExecutor('batch', min(BATCH_CONCURRENCY, len(items)), thread_name_prefix='batch') as pool:
+            results = list(pool.map(lambda item: run_batch_item(app, uid, item, brief, content_type, fresh), items))
+
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        # Items served from the generation cache are refunded like failures: only new generations cost quota.
+        cached = sum(1 for result in results if result['status'] == 'succeeded' and result['data'].get('cached'))
+        reservation.refund(failed + cached)
+        reservation.commit()
+
+        summary = {'items': results, 'succeeded': len(results) - failed, 'failed': failed, 'cached': cached,
+                   'refunded': 0 if reservation.unlimited else failed + cached}
+        if failed == len(results):
+            return jsonify({'success': False, 'error': 'All batch items failed', 'data': summary}), 500
+        return jsonify({'success': True, 'data': summary})
+    
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error in batch content generation: {e}", exc_info=True)
+        return _content_error_response(e)
+
+@content_bp.route('/content/cache/stats', methods=['GET'])
+def get_generation_cache_stats():
+    """Hit/miss counters for the generation result cache in this worker."""
+    return jsonify({'success': True, 'data': generation_cache.stats()})
+
+job_event_streams = threading.BoundedSemaphore(JOB_EVENTS_MAX_STREAMS)
+
+@content_bp.route('/content/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    """Job status for its owner; poll every `poll_interval_seconds` until it is finished."""
+    job = generation_jobs.get(job_id, request_uid(request.args))
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    response = jsonify({'success': True, 'data': job.to_dict()})
+    if not job.is_finished():
+        response.headers['Retry-After'] = str(JOB_POLL_INTERVAL_SECONDS)
+    return response
+
+@content_bp.route('/content/jobs/<job_id>/events', methods=['GET'])
+def stream_generation_job(job_id):
+    """Server-sent events stream that emits the job state on every change.
+
+    At most JOB_EVENTS_MAX_STREAMS streams are open per worker, each for at most
+    JOB_EVENTS_MAX_SECONDS; EventSource reconnects after that, and clients that
+    are turned away with a 503 poll the status URL instead.
+    """
+    job = generation_jobs.get(job_id, request_uid(request.args))
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    if not job_event_streams.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Too many event streams, poll the status URL instead',
+                            'status_url': f"/api/content/jobs/{job.id}"})
+        response.headers['Retry-After'] = str(JOB_POLL_INTERVAL_SECONDS)
+        return response, 503
+
+    def events():
+        yield f"retry: {JOB_POLL_INTERVAL_SECONDS * 1000}\n\n"
+        seen_version = None
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while time.monotonic() < deadline:
+            current = generation_jobs.wait_for_update(
+                job_id, seen_version, min(JOB_EVENTS_HEARTBEAT_SECONDS, max(0, deadline - time.monotonic()))
+            )
+            if current is None:
+                return
+            if current.version == seen_version:
+                yield ": keep-alive\n\n"
+                continue
+            seen_version = current.version
+            yield f"event: {current.status}\ndata: {json.dumps(current.to_dict())}\n\n"
+            if current.is_finished():
+                return
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the response is closed, whether the stream finished, timed out or the client left.
+    response.call_on_close(job_event_streams.release)
+    return response
+
+def build_pending_post(user_id, data):
+    """Validates one manual post payload and returns its pending_posts document."""
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    text = data.get('text')
+    media_url = data.get('media_url')
+    media_type = data.get('media_type')
+    platforms = data.get('platforms')
+
+    if not all([text, media_url, media_type, platforms]):
+        raise ValueError('Missing required fields')
+
+    return {
+        'user_id': user_id,
+        'text': text,
+        'media_url': media_url,
+        # Client-supplied URIs are kept only if they point into the configured storage.
+        'media_gcs_uri': media_storage.uri_from_url(data.get('media_gcs_uri')) or media_storage.uri_from_url(media_url),
+        'media_type': media_type,
+        'platforms': platforms,
+        'status': 'pending',
+        'created_at': SERVER_TIMESTAMP
+    }
 
 @content_bp.route('/content/manual', methods=['POST'])
 def manual_post_route():
     try:
         data = request.get_json()
-        uid = data.get('uid')
-        text = data.get('text')
-        media_url = data.get('media_url')
-        media_type = data.get('media_type')
-        platforms = data.get('platforms')
+        uid = request_uid(data)
 
-        if not all([uid, text, media_url, media_type, platforms]):
+        if not uid:
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+        try:
+            post = build_pending_post(None, data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
 
-        user = get_user_or_404(uid)
+        post['user_id'] = verified_user_id(uid)
+        tag(**{'user.id': post['user_id']})
 
-        post_ref = firestore_db.collection('pending_posts').document()
-        post_ref.set({
-            'user_id': user.id,
-            'text': text,
-            'media_url': media_url,
-            'media_type': media_type,
-            'platforms': platforms,
-            'status': 'pending',
-            'created_at': firestore.SERVER_TIMESTAMP
-        })
+        with span('firestore.write'):
+            post_ref = get_firestore_client().collection(PENDING_POSTS_COLLECTION).document()
+            post_ref.set(post)
 
         return jsonify({'success': True, 'message': 'Content sent to approval queue.'})
     except Exception as e:
         logging.error(f"Error in manual post submission: {e}", exc_info=True)
         return jsonify({'success': False, 'error': f'Failed to submit content: {str(e)}'}), 500
 
+@content_bp.route('/content/manual/bulk', methods=['POST'])
+def bulk_manual_post_route():
+    """Queues many manual posts for one user through Firestore batched writes.
+
+    The user is resolved once (from the bearer token when present) and posts
+    are committed in WriteBatch chunks of FIRESTORE_BATCH_LIMIT, so N posts
+    cost ceil(N / 500) commits instead of N
+    HTTP requests, N user lookups and N single-document writes
+    (benchmarks/bulk_manual_posts.py compares the two). Each item reports its
+    document id or its error; a failed commit fails only the posts in its chunk.
+    """
+    try:
+        data = request.get_json()
+        uid = request_uid(data)
+        posts = data.get('posts')
+
+        if not uid or not isinstance(posts, list) or not posts:
+            return jsonify({'success': False, 'error': 'uid and a non-empty posts list are required'}), 400
+        if len(posts) > MAX_BULK_POSTS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BULK_POSTS} posts per request'}), 400
+
+        user_id = verified_user_id(uid)
+        tag(**{'user.id': user_id, 'posts.count': len(posts)})
+        collection = get_firestore_client().collection(PENDING_POSTS_COLLECTION)
+
+        results = []
+        valid = []
+        for index, item in enumerate(posts):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Each post must be an object')
+                valid.append((index, collection.document(), build_pending_post(user_id, item)))
+                results.append(None)
+            except ValueError as e:
+                results.append({'index': index, 'success': False, 'error': str(e)})
+
+        commit_failed = False
+        for start in range(0, len(valid), FIRESTORE_BATCH_LIMIT):
+            chunk = valid[start:start + FIRESTORE_BATCH_LIMIT]
+            batch = get_firestore_client().batch()
+            for _, post_ref, post in chunk:
+                batch.set(post_ref, post)
+            try:
+                with span('firestore.batch_commit', writes=len(chunk)):
+                    batch.commit()
+                error = None
+            except Exception as e:
+                logging.error(f"Bulk post batch starting at item {chunk[0][0]} failed: {e}", exc_info=True)
+                error = f'Failed to submit content: {str(e)}'
+                commit_failed = True
+            for index, post_ref, _ in chunk:
+                if error is None:
+                    results[index] = {'index': index, 'success': True, 'id': post_ref.id}
+                else:
+                    results[index] = {'index': index, 'success': False, 'error': error}
+
+        created = sum(1 for result in results if result['success'])
+        status = 200 if created else (500 if commit_failed else 400)
+        return jsonify({'success': created > 0, 'created': created, 'failed': len(results) - created,
+                        'results': results}), status
+    except Exception as e:
+        logging.error(f"Error in bulk manual post submission: {e}", exc_info=True)
+        return jsonify({'success': False, 'error': f'Failed to submit content: {str(e)}'}), 500
+
+def resign_post_media(posts):
+    """Replaces stored (possibly expired) media URLs with fresh signed URLs in one batch."""
+    signed = sign_gcs_uris([post['media_gcs_uri'] for post in posts if post.get('media_gcs_uri')])
+    for post in posts:
+        if post.get('media_gcs_uri'):
+            # Keep the stored URL when the URI cannot be signed.
+            post['media_url'] = signed[post['media_gcs_uri']] or post.get('media_url')
+
+@content_bp.route('/content/media/sign', methods=['POST'])
+def sign_media_route():
+    """Signs a batch of media URIs (or previously signed media URLs) in one call."""
+    try:
+        data = request.get_json()
+        uris = data.get('uris')
+        if not isinstance(uris, list) or not uris:
+            return jsonify({'success': False, 'error': 'uris must be a non-empty list'}), 400
+        if len(uris) > MAX_SIGN_BATCH_SIZE:
+            return jsonify({'success': False, 'error': f'At most {MAX_SIGN_BATCH_SIZE} uris per request'}), 400
+
+        # URIs outside the configured storage are not recognised and come back as null.
+        gcs_uris = {uri: media_storage.uri_from_url(uri) for uri in uris}
+        signed = sign_gcs_uris([gcs_uri for gcs_uri in gcs_uris.values() if gcs_uri])
+        return jsonify({'success': True, 'data': {
+            uri: signed[gcs_uri] if gcs_uri else None for uri, gcs_uri in gcs_uris.items()
+        }})
+    except Exception as e:
+        logging.error(f"Error signing media URLs: {e}", exc_info=True)
+        return jsonify({'success': False, 'error': f'Failed to sign media URLs: {str(e)}'}), 500
+
+def _project_post(post_data, fields):
+    resign_post_media([post_data])
+    if fields is None:
+        return post_data
+    return {key: post_data.get(key) for key in ('id',) + fields}
+
+def serve_pending_from_index(limit, user_id, fields):
+    """Answers /content/pending from the live snapshot index without touching Firestore."""
+    since = request.args.get('since')
+    platform = request.args.get('platform')
+    if since is not None:
+        delta = pending_index.changes_since(int(since))
+        if delta is not None:
+            upserted, removed, sequence = delta
+            upserted = [post for post in upserted
+                        if (user_id is None or post.get('user_id') == user_id)
+                        and (not platform or platform in (post.get('platforms') or ()))]
+            return jsonify({'success': True, 'data': [_project_post(post, fields) for post in upserted],
+                            'removed': removed, 'since': sequence, 'reset': False})
+
+    posts, next_cursor, sequence = pending_index.page(
+        limit, cursor=request.args.get('cursor'), user_id=user_id, platform=platform
+    )
+    return jsonify({'success': True, 'data': [_project_post(post, fields) for post in posts],
+                    'next_cursor': next_cursor, 'since': sequence, 'reset': since is not None})
+
 @content_bp.route('/content/pending', methods=['GET'])
 def get_pending_posts():
+    """Streams one page of pending posts, oldest first.
+
+    Query parameters: `limit` (capped at PENDING_PAGE_SIZE_MAX), `cursor` (the
+    `next_cursor` of the previous page), `user_id`, `platform` and `fields`
+    (comma-separated projection). The response ends with `next_cursor`, which
+    is null on the last page.
+
+    With PENDING_LIVE_INDEX enabled the page is served from the in-memory
+    snapshot index instead, and `since` returns only the changes after that
+    sequence number.
+    """
     try:
-        posts_ref = firestore_db.collection('pending_posts').where('status', '==', 'pending').order_by('created_at').stream()
-        posts = []
-        for post in posts_ref:
-            post_data = post.to_dict()
-            post_data['id'] = post.id
-            posts.append(post_data)
-        return jsonify({'success': True, 'data': posts})
+        limit = max(1, min(int(request.args.get('limit', PENDING_PAGE_SIZE_DEFAULT)), PENDING_PAGE_SIZE_MAX))
+        user_id = request.args.get('user_id')
+        if user_id is not None and user_id.isdigit():
+            user_id = int(user_id)
+        fields = parse_fields(request.args.get('fields'))
+
+        if pending_index.enabled:
+            pending_index.ensure_started(
+                lambda: get_firestore_client().collection(PENDING_POSTS_COLLECTION).where('status', '==', 'pending')
+            )
+            if pending_index.is_ready():
+                return serve_pending_from_index(limit, user_id, fields)
+
+        query = build_pending_query(
+            get_firestore_client(), limit, cursor=request.args.get('cursor'), user_id=user_id,
+            platform=request.args.get('platform'), fields=fields
+        )
+        documents = query.stream()
+        # Pull the first document now so query errors (e.g. a missing index) still produce a 500.
+        first = next(documents, None)
+    except (ValueError, InvalidCursor) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Error fetching pending posts: {e}", exc_info=True)
         return jsonify({'success': False, 'error': f'Failed to fetch pending posts: {str(e)}'}), 500
+
+    dumps = current_app.json.dumps
+
+    def serialize(post):
+        post_data = post.to_dict()
+        post_data['id'] = post.id
+        return dumps(_project_post(post_data, fields))
+
+    def body():
+        yield '{"success": true, "data": ['
+        next_cursor = None
+        count = 0
+        last = None
+        post = first
+        while post is not None:
+            if count == limit:
+                next_cursor = encode_cursor(last.get('created_at'), last.id)
+                break
+            yield (',' if count else '') + serialize(post)
+            last = post
+            count += 1
+            post = next(documents, None)
+        yield '], "next_cursor": ' + dumps(next_cursor) + '}'
+
+    return Response(stream_with_context(body()), mimetype='application/json')
@@ -1,5 +1,9 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.serializers.user import serialize_user, json_response
+from src.services.conditional import (
+    PrecompressedPayload, load_validator_row, user_validators, is_not_modified, not_modified, with_validators
+)
 from datetime import datetime, timedelta
 import os
 
@@ -37,30 +41,52 @@ SUBSCRIPTION_PLANS = {
     }
 }
 
+# Quotas a tier without a plan entry (trial) is reset to: the model's column defaults.
+QUOTA_ALLOCATION_COLUMNS = ('image_quota', 'video_v2_quota', 'video_v3_quota', 'text_quota')
+DEFAULT_QUOTA_ALLOCATION = {name: User.__table__.c[name].default.arg for name in QUOTA_ALLOCATION_COLUMNS}
+
+def quota_allocation(tier):
+    """Per-period quota column values for a subscription tier."""
+    allocation = dict(DEFAULT_QUOTA_ALLOCATION)
+    plan = SUBSCRIPTION_PLANS.get(tier)
+    if plan:
+        allocation['image_quota'] = plan['image_credits']
+        allocation['video_v2_quota'] = plan['video_credits']
+    return allocation
+
 ADDON_PACKS = {
     'image_100': {'price': 4.99, 'image_credits': 100},
     'video_1': {'price': 6.99, 'video_credits': 1},
     'video_5': {'price': 29.99, 'video_credits': 5},
 }
 
+# The plans only change with a deploy, so the response is encoded and gzipped once.
+PLANS_PAYLOAD = PrecompressedPayload({
+    'success': True,
+    'plans': SUBSCRIPTION_PLANS,
+    'addons': ADDON_PACKS
+})
+
 @subscription_bp.route('/plans', methods=['GET'])
 def get_plans():
     """Get available subscription plans"""
-    return jsonify({
-        'success': True,
-        'plans': SUBSCRIPTION_PLANS,
-        'addons': ADDON_PACKS
-    })
+    return PLANS_PAYLOAD.response()
 
 @subscription_bp.route('/user/subscription', methods=['GET'])
 def get_user_subscription():
     """Get current user's subscription status"""
     user_id = request.args.get('user_id', 1)
-    user = User.query.get(user_id)
-    if not user:
+    now = datetime.utcnow()
+    row = load_validator_row(user_id)
+    if not row:
         return jsonify({'success': False, 'error': 'User not found'}), 404
-    
-    return jsonify({'success': True, 'subscription': user.to_dict()})
+    etag, last_modified = user_validators(row, now, 'subscription')
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    user = User.query.get(user_id)
+    response = json_response({'success': True, 'subscription': serialize_user(user, now=now)})
+    return with_validators(response, etag, last_modified)
 
 @subscription_bp.route('/user/subscription/upgrade', methods=['POST'])
 def upgrade_subscription():
@@ -79,7 +105,6 @@ def upgrade_subscription():
     if not user:
         return jsonify({'success': False, 'error': 'User not found'}), 404
     
-    plan_details = SUBSCRIPTION_PLANS[plan]
     user.subscription_tier = plan
     user.subscription_status = 'active'
     user.subscription_start_date = datetime.utcnow()
@@ -87,19 +112,17 @@ def upgrade_subscription():
     user.quota_reset_date = datetime.utcnow() + timedelta(days=30)
     
     # Reset credits to the new plan's allocation
-    user.image_credits = plan_details['image_credits']
-    user.image_credits_remaining = plan_details['image_credits']
-    user.video_credits = plan_details['video_credits']
-    user.video_credits_remaining = plan_details['video_credits']
+    for column, value in quota_allocation(plan).items():
+        setattr(user, column, value)
     
     user.payment_method_verified = True # Simulate successful payment
     
     db.session.commit()
     
-    return jsonify({
+    return json_response({
         'success': True,
         'message': f'Successfully upgraded to {plan} plan',
-        'user': user.to_dict()
+        'user': serialize_user(user)
     })
 
 @subscription_bp.route('/user/credits/add', methods=['POST'])
@@ -130,10 +153,10 @@ def add_credits():
         
     db.session.commit()
     
-    return jsonify({
+    return json_response({
         'success': True,
         'message': 'Credits added successfully',
-        'user': user.to_dict()
+        'user': serialize_user(user)
     })
 
 @subscription_bp.route('/user/subscription/cancel', methods=['POST'])
@@ -1,15 +1,43 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, g, stream_with_context
 from src.models.user import User, db
+from src.services.auth_tokens import issue_token, verify_password, PasswordCheckBusy, PASSWORD_HASH_TIMEOUT_SECONDS
+from src.services.demo_users import DEMO_ROLE, demo_expiry
+from src.services.conditional import (
+    load_validator_row, user_validators, is_not_modified, not_modified, with_validators
+)
+from src.serializers.user import (
+    serialize_user, columns_for, dumps, json_response, access_flags, PROJECTIONS, ADMIN_PROJECTIONS, USER_FIELDS
+)
 from datetime import datetime, timedelta
 
 user_bp = Blueprint('user', __name__)
 
+USERS_PAGE_SIZE_MAX = 1000
+# Rows fetched per round trip when the full listing is streamed.
+USERS_YIELD_PER = 500
+USER_FILTERS = ('role', 'subscription_tier', 'subscription_status')
+
+class ViewForbidden(ValueError):
+    """The requested view is reserved for authenticated admins."""
+
+def requested_view(default='full'):
+    """Reads the `view` query parameter (a serializer projection name)."""
+    view = request.args.get('view', default)
+    if view not in PROJECTIONS:
+        raise ValueError(f"Unknown view '{view}'. Choose one of: {', '.join(PROJECTIONS)}")
+    if view in ADMIN_PROJECTIONS and not (g.get('identity') and g.identity.role == 'admin'):
+        raise ViewForbidden(f"The '{view}' view requires an admin token")
+    return view
+
+def view_error(e):
+    return jsonify({'success': False, 'error': str(e)}), 403 if isinstance(e, ViewForbidden) else 400
+
 @user_bp.route('/auth/login', methods=['POST'])
 def login():
     """User login endpoint"""
     data = request.get_json(force=True)
     username = data.get('username')
-    password = data.get('password')  # In production, verify password hash
+    password = data.get('password')
     
     if not username:
         return jsonify({'success': False, 'error': 'Username required'}), 400
@@ -19,50 +47,77 @@ def login():
         # For demo, we don't create a user on regular login
         return jsonify({'success': False, 'error': 'User not found'}), 404
     
-    # In a real app, you would verify the password hash here
+    # Accounts created without a password (demo and invited users) still log in by username.
+    try:
+        if user.password_hash and not verify_password(user.password_hash, password):
+            return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
+    except PasswordCheckBusy:
+        response = jsonify({'success': False, 'error': 'Login is busy, please retry shortly'})
+        response.headers['Retry-After'] = str(PASSWORD_HASH_TIMEOUT_SECONDS)
+        return response, 503
     
-    return jsonify({
+    return json_response({
         'success': True,
         'message': 'Login successful',
-        'user': user.to_dict(),
-        'token': f"demo_token_{user.id}"
+        'user': serialize_user(user),
+        'token': issue_token(user)
     })
 
 @user_bp.route('/auth/demo-login', methods=['POST'])
 def demo_login():
     """Creates a temporary demo user and returns login credentials."""
-    demo_username = f"demo_user_{datetime.utcnow().timestamp()}"
+    now = datetime.utcnow()
+    demo_username = f"demo_user_{now.timestamp()}"
+    # Demo accounts expire after DEMO_USER_TTL_HOURS and are then deleted by the demo sweeper.
     user = User(
         username=demo_username,
         email=f"{demo_username}@example.com",
-        role='demo',
+        role=DEMO_ROLE,
         subscription_tier='pro',
         subscription_status='active',
-        image_credits=0,
-        image_credits_remaining=0,
-        video_credits=0,
-        video_credits_remaining=0
+        created_at=now,
+        subscription_start_date=now,
+        subscription_end_date=demo_expiry(now),
+        image_quota=0,
+        video_v2_quota=0,
+        video_v3_quota=0
     )
     db.session.add(user)
     db.session.commit()
     
     # Here you would pre-populate with fake data
     
-    return jsonify({
+    return json_response({
         'success': True,
-        'user': user.to_dict(),
-        'token': f"demo_token_{user.id}"
+        'user': serialize_user(user),
+        'token': issue_token(user)
     })
 
 @user_bp.route('/auth/check-access', methods=['GET'])
 def check_access():
-    """Check if user has access to the platform"""
-    user_id = request.args.get('user_id', 1)
+    """Check if user has access to the platform.
+
+    Polled by the frontend, so it answers 304 from a validator-only query when
+    the client's copy is still current.
+    """
+    user_id = request.args.get('user_id') or (g.identity.user_id if g.get('identity') else 1)
     
-    user = User.query.get(user_id)
-    if not user:
+    now = datetime.utcnow()
+    row = load_validator_row(user_id)
+    if not row:
         return jsonify({'success': False, 'error': 'User not found'}), 404
-    
+
+    # trial_days_remaining ticks down daily, so it is part of the validators too.
+    trial_active = access_flags(row, now)[0]
+    trial_days_remaining = max(0, (row.trial_end_date - now).days) if trial_active else None
+    boundaries = ()
+    if trial_active:
+        boundaries = (row.trial_end_date - timedelta(days=trial_days_remaining + 1),)
+    etag, last_modified = user_validators(row, now, f"check-access:{trial_days_remaining}", boundaries)
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    user = User.query.get(user_id)
     has_access = user.has_access()
     
     response_data = {
@@ -82,25 +137,87 @@ def check_access():
         response_data['trial_days_remaining'] = trial_days_remaining
         response_data['trial_end_date'] = user.trial_end_date.isoformat()
     
-    return jsonify(response_data)
+    return with_validators(jsonify(response_data), etag, last_modified)
 
 @user_bp.route('/user/details', methods=['GET'])
 def get_user_details():
     """Fetches the full user object."""
-    user_id = request.args.get('user_id')
+    user_id = request.args.get('user_id') or (g.identity.user_id if g.get('identity') else None)
     if not user_id:
         return jsonify({'success': False, 'error': 'User ID is required'}), 400
     
-    user = User.query.get(user_id)
-    if not user:
+    try:
+        view = requested_view()
+    except ValueError as e:
+        return view_error(e)
+
+    now = datetime.utcnow()
+    row = load_validator_row(user_id)
+    if not row:
         return jsonify({'success': False, 'error': 'User not found'}), 404
-        
-    return jsonify({'success': True, 'user': user.to_dict()})
+    etag, last_modified = user_validators(row, now, f"details:{view}")
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    user = User.query.get(user_id)
+    response = json_response({'success': True, 'user': serialize_user(user, view, now)})
+    return with_validators(response, etag, last_modified)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Lists users, optionally one keyset page at a time.
+
+    Query parameters: `limit`, `after_id` (the X-Next-Cursor header of the
+    previous page), `role`, `subscription_tier`, `subscription_status`, and
+    either `view` (a serializer projection) or `fields` (comma-separated
+    keys). Only the columns needed for the requested fields are selected. The
+    body stays a JSON array. Without `limit` every matching user is streamed,
+    as before pagination existed; with it the X-Next-Cursor header points at
+    the next page and is absent on the last one.
+    """
+    try:
+        limit = request.args.get('limit')
+        if limit is not None:
+            limit = max(1, min(int(limit), USERS_PAGE_SIZE_MAX))
+        after_id = int(request.args.get('after_id', 0))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and after_id must be integers'}), 400
+
+    try:
+        fields = PROJECTIONS[requested_view()]
+    except ValueError as e:
+        return view_error(e)
+    if request.args.get('fields'):
+        fields = tuple(dict.fromkeys(field.strip() for field in request.args['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in USER_FIELDS]
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    query = db.session.query(*columns_for(fields)).filter(User.id > after_id)
+    for name in USER_FILTERS:
+        if request.args.get(name):
+            query = query.filter(getattr(User, name) == request.args[name])
+    query = query.order_by(User.id)
+
+    headers = {}
+    if limit is None:
+        # Fetched in chunks while the body is written, so the whole table is never held in memory.
+        rows = query.yield_per(USERS_YIELD_PER)
+    else:
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers['X-Next-Cursor'] = str(rows[-1].id)
+
+    now = datetime.utcnow()
+
+    def body():
+        yield b'['
+        for index, row in enumerate(rows):
+            yield (b',' if index else b'') + dumps(serialize_user(row, fields, now))
+        yield b']'
+
+    return Response(stream_with_context(body()), mimetype='application/json', headers=headers)
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -119,12 +236,16 @@ def create_user():
     )
     db.session.add(user)
     db.session.commit()
-    return jsonify(user.to_dict()), 201
+    return json_response(serialize_user(user), 201)
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
+    try:
+        view = requested_view()
+    except ValueError as e:
+        return view_error(e)
     user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    return json_response(serialize_user(user, view))
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
@@ -133,7 +254,7 @@ def update_user(user_id):
     user.username = data.get('username', user.username)
     user.email = data.get('email', user.email)
     db.session.commit()
-    return jsonify(user.to_dict())
+    return json_response(serialize_user(user))
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
@@ -0,0 +1,127 @@
+import json
+from datetime import datetime
+from operator import attrgetter
+from flask import Response
+from src.models.user import User
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Keys of User.to_dict() that are plain columns, in to_dict() order.
+USER_COLUMN_FIELDS = (
+    'id', 'username', 'email', 'role', 'subscription_tier', 'subscription_status',
+    'trial_start_date', 'trial_end_date', 'subscription_start_date', 'subscription_end_date',
+    'quota_reset_date', 'image_quota', 'video_v2_quota', 'video_v3_quota', 'text_quota',
+    'payment_method_verified', 'created_at', 'updated_at'
+)
+# Columns only exposed through the admin view.
+USER_ADMIN_COLUMN_FIELDS = ('stripe_customer_id', 'stripe_subscription_id')
+# Computed keys and the columns they are derived from.
+USER_FLAG_FIELDS = {
+    'has_access': ('role', 'subscription_status', 'trial_end_date', 'subscription_end_date'),
+    'is_trial_active': ('subscription_status', 'trial_end_date'),
+    'is_subscription_active': ('subscription_status', 'subscription_end_date')
+}
+USER_FIELDS = USER_COLUMN_FIELDS + tuple(USER_FLAG_FIELDS)
+# Order of the values returned by access_flags().
+ACCESS_FLAG_NAMES = ('is_trial_active', 'is_subscription_active', 'has_access')
+
+PROJECTIONS = {
+    # Same keys as User.to_dict().
+    'full': USER_COLUMN_FIELDS[:16] + tuple(USER_FLAG_FIELDS) + USER_COLUMN_FIELDS[16:],
+    'public': ('id', 'username', 'role', 'subscription_tier', 'created_at'),
+    'quota': (
+        'id', 'subscription_tier', 'subscription_status', 'quota_reset_date',
+        'image_quota', 'video_v2_quota', 'video_v3_quota', 'text_quota', 'has_access'
+    ),
+    'admin': USER_COLUMN_FIELDS + USER_ADMIN_COLUMN_FIELDS + tuple(USER_FLAG_FIELDS)
+}
+# Projections that include billing identifiers; routes serve them only to authenticated admins.
+ADMIN_PROJECTIONS = ('admin',)
+
+
+def resolve_fields(projection):
+    """Accepts a projection name or an explicit field tuple."""
+    if isinstance(projection, str):
+        return PROJECTIONS[projection]
+    return projection
+
+
+def columns_for(fields):
+    """User columns that must be loaded to serialize `fields` (always including id)."""
+    needed = {'id'}
+    for field in fields:
+        needed.update(USER_FLAG_FIELDS.get(field, (field,)))
+    return [getattr(User, name) for name in USER_COLUMN_FIELDS + USER_ADMIN_COLUMN_FIELDS if name in needed]
+
+
+def access_flags(user, now):
+    """Returns (is_trial_active, is_subscription_active, has_access) evaluated at `now`."""
+    status = user.subscription_status
+    trial_active = bool(status == 'trialing' and user.trial_end_date and now < user.trial_end_date)
+    subscription_active = bool(status == 'active' and user.subscription_end_date and now < user.subscription_end_date)
+    return trial_active, subscription_active, trial_active or subscription_active or user.role == 'admin'
+
+
+_plans = {}
+
+
+def _plan(fields):
+    """Caches, per field tuple, one C-level getter for all the plain columns."""
+    plan = _plans.get(fields)
+    if plan is None:
+        columns = tuple(field for field in fields if field not in USER_FLAG_FIELDS)
+        flags = tuple(field for field in fields if field in USER_FLAG_FIELDS)
+        if len(columns) > 1:
+            getter = attrgetter(*columns)
+        elif columns:
+            single = attrgetter(columns[0])
+            getter = lambda user: (single(user),)
+        else:
+            getter = lambda user: ()
+        plan = _plans[fields] = (columns, flags, getter)
+    return plan
+
+
+def serialize_user(user, projection='full', now=None):
+    """Serializes a User (or a column-projected row) for the given projection.
+
+    The access flags are computed once, from a single timestamp, instead of
+    re-reading the clock for each flag as the model helpers do. Datetimes are
+    left as objects; `dumps` encodes them in isoformat().
+    """
+    columns, flags, getter = _plan(resolve_fields(projection))
+    result = dict(zip(columns, getter(user)))
+    if flags:
+        values = dict(zip(ACCESS_FLAG_NAMES, access_flags(user, now or datetime.utcnow())))
+        for field in flags:
+            result[field] = values[field]
+    return result
+
+
+def serialize_users(users, projection='full', now=None):
+    now = now or datetime.utcnow()
+    fields = resolve_fields(projection)
+    return [serialize_user(user, fields, now) for user in users]
+
+
+def _encode_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """Encodes to JSON bytes with orjson when it is installed, otherwise the stdlib.
+
+    Both backends write naive datetimes the way datetime.isoformat() does.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), default=_encode_default).encode('utf-8')
+
+
+def json_response(payload, status=200, headers=None):
+    return Response(dumps(payload), status=status, mimetype='application/json', headers=headers)
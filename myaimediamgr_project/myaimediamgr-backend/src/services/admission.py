@@ -0,0 +1,265 @@
+import os
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from google.api_core import exceptions
+from src.services.metrics import (
+    ADMISSION_WAIT, ADMISSION_REJECTED, ADMISSION_THROTTLED, ADMISSION_CONCURRENCY_LIMIT, ADMISSION_BREAKER_OPEN
+)
+
+# --- Configuration ---
+# Limits are per worker process: with several workers or instances, size each
+# model's requests-per-minute to its share of the project's Vertex AI quota.
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv('ADMISSION_MAX_WAIT_SECONDS', '30'))
+ADMISSION_BREAKER_THRESHOLD = int(os.getenv('ADMISSION_BREAKER_THRESHOLD', '5'))
+ADMISSION_BREAKER_COOLDOWN_SECONDS = float(os.getenv('ADMISSION_BREAKER_COOLDOWN_SECONDS', '30'))
+# 'fail' rejects calls at once while the breaker is open; 'queue' holds them until it half-opens.
+ADMISSION_BREAKER_MODE = os.getenv('ADMISSION_BREAKER_MODE', 'fail').lower()
+# At most one multiplicative decrease per window, so one burst of 429s halves the limit once.
+ADMISSION_DECREASE_WINDOW_SECONDS = 1.0
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+
+class AdmissionRejected(Exception):
+    """Raised when a model call cannot be admitted; `retry_after` is a hint in seconds."""
+
+    def __init__(self, model, reason, retry_after):
+        super().__init__(f"{model} is over capacity ({reason}), please retry in {math.ceil(retry_after)}s.")
+        self.model = model
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ModelAdmission:
+    """Admission control for one model: circuit breaker, AIMD concurrency limit and token bucket.
+
+    Each call first passes the circuit breaker, then waits for a concurrency
+    slot and finally for a token. The bucket refills at `rpm` per minute and
+    holds at most `burst` tokens (rpm=0 disables it). The concurrency limit
+    starts at `max_concurrency`. Every ResourceExhausted halves it, and every success
+    adds 1/limit, so it grows back by about one slot per round of calls. The
+    token refill rate is scaled by the same limit/max_concurrency factor, so
+    throttling slows both how many calls run and how fast new ones start.
+
+    `ADMISSION_BREAKER_THRESHOLD` consecutive ResourceExhausted errors open the
+    breaker for the cooldown. After that one probe call is let through
+    (half-open): only a successful probe closes the breaker, and a probe that
+    raises anything re-opens it. Other errors outside a probe leave the limit
+    and the breaker alone. Waiting for admission is bounded by `max_wait`
+    seconds, after which AdmissionRejected is raised.
+    """
+
+    def __init__(self, name, rpm, max_concurrency, burst=None, max_wait=ADMISSION_MAX_WAIT_SECONDS,
+                 breaker_threshold=ADMISSION_BREAKER_THRESHOLD, breaker_cooldown=ADMISSION_BREAKER_COOLDOWN_SECONDS,
+                 breaker_mode=ADMISSION_BREAKER_MODE):
+        self.name = name
+        self.rate = rpm / 60.0
+        self.burst = burst or max_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_mode = breaker_mode
+
+        self._condition = threading.Condition()
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._decreased_at = 0.0
+        self._breaker = BREAKER_CLOSED
+        self._opened_until = 0.0
+        self._probe_in_flight = False
+        self._consecutive_throttles = 0
+        self._counters = {'admitted': 0, 'rejected': 0, 'throttled': 0, 'breaker_opened': 0}
+
+        self._limit_gauge = ADMISSION_CONCURRENCY_LIMIT.labels(name)
+        self._breaker_gauge = ADMISSION_BREAKER_OPEN.labels(name)
+        self._throttled_counter = ADMISSION_THROTTLED.labels(name)
+        self._limit_gauge.set(self._limit)
+        self._breaker_gauge.set(0)
+
+    # --- Admission ---
+
+    @contextmanager
+    def admit(self):
+        """Holds a slot for the duration of one model call and feeds its outcome back."""
+        started = time.perf_counter()
+        try:
+            probe = self._acquire(time.monotonic() + self.max_wait)
+        except AdmissionRejected as e:
+            ADMISSION_WAIT.labels(self.name, 'rejected').observe(time.perf_counter() - started)
+            ADMISSION_REJECTED.labels(self.name, e.reason).inc()
+            raise
+        ADMISSION_WAIT.labels(self.name, 'admitted').observe(time.perf_counter() - started)
+
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'success'
+        except exceptions.ResourceExhausted:
+            outcome = 'throttled'
+            raise
+        finally:
+            self._release(probe, outcome)
+
+    def _acquire(self, deadline):
+        """Waits for the breaker, a concurrency slot and a token; returns True for a half-open probe."""
+        with self._condition:
+            probe = self._wait_for_breaker(deadline)
+            slot = False
+            try:
+                while self._in_flight >= max(1, int(self._limit)):
+                    self._wait_until(deadline, 'concurrency', 1.0)
+                # The slot is held while waiting for a token so waiters cannot overshoot the limit.
+                self._in_flight += 1
+                slot = True
+                while True:
+                    wait = self._take_token()
+                    if wait == 0:
+                        break
+                    if wait > deadline - time.monotonic():
+                        # No token will be free before the deadline; say so now rather than at the deadline.
+                        self._reject('rate', wait)
+                    self._wait_until(deadline, 'rate', wait, sleep=wait)
+            except AdmissionRejected:
+                if slot:
+                    self._in_flight -= 1
+                if probe:
+                    self._probe_in_flight = False
+                self._condition.notify_all()
+                raise
+            self._counters['admitted'] += 1
+            return probe
+
+    def _wait_for_breaker(self, deadline):
+        while True:
+            now = time.monotonic()
+            if self._breaker == BREAKER_OPEN and now >= self._opened_until:
+                self._breaker = BREAKER_HALF_OPEN
+            if self._breaker == BREAKER_CLOSED:
+                return False
+            if self._breaker == BREAKER_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            retry_after = max(self._opened_until - now, 1.0)
+            if self.breaker_mode != 'queue' or self._opened_until > deadline:
+                self._reject('breaker_open', retry_after)
+            # Open: sleep out the cooldown. Half-open: the probe's release wakes us.
+            self._wait_until(deadline, 'breaker_open', retry_after,
+                             sleep=self._opened_until - now if self._breaker == BREAKER_OPEN else None)
+
+    def _wait_until(self, deadline, reason, retry_after, sleep=None):
+        """Waits on the condition (or `sleep` seconds), rejecting once `deadline` has passed."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._reject(reason, retry_after)
+        self._condition.wait(remaining if sleep is None else max(sleep, 0.001))
+
+    def _reject(self, reason, retry_after):
+        self._counters['rejected'] += 1
+        raise AdmissionRejected(self.name, reason, max(retry_after, 1.0))
+
+    def _take_token(self):
+        """Takes a token if one is available and returns 0, otherwise the seconds until one is."""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        rate = self.rate * self._limit / self.max_concurrency
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * rate)
+        self._refilled_at = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / rate
+
+    # --- Feedback ---
+
+    def _release(self, probe, outcome):
+        with self._condition:
+            self._in_flight -= 1
+            if probe:
+                self._probe_in_flight = False
+            if outcome == 'throttled':
+                self._on_throttle(probe)
+            elif outcome == 'success':
+                self._on_success(probe)
+            elif probe:
+                self._open_breaker(time.monotonic(), "after a failed half-open probe")
+            self._condition.notify_all()
+
+    def _on_success(self, probe):
+        self._consecutive_throttles = 0
+        if probe:
+            self._breaker = BREAKER_CLOSED
+            self._breaker_gauge.set(0)
+            logging.info(f"Admission: circuit breaker for {self.name} closed")
+        self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+        self._limit_gauge.set(self._limit)
+
+    def _on_throttle(self, probe):
+        now = time.monotonic()
+        self._counters['throttled'] += 1
+        self._throttled_counter.inc()
+        self._consecutive_throttles += 1
+        if now - self._decreased_at >= ADMISSION_DECREASE_WINDOW_SECONDS:
+            self._limit = max(1.0, self._limit / 2)
+            self._decreased_at = now
+            self._limit_gauge.set(self._limit)
+        if probe or self._consecutive_throttles >= self.breaker_threshold:
+            self._open_breaker(now, f"after {self._consecutive_throttles} ResourceExhausted errors")
+
+    def _open_breaker(self, now, reason):
+        if self._breaker != BREAKER_OPEN:
+            self._counters['breaker_opened'] += 1
+            logging.warning(
+                f"Admission: circuit breaker for {self.name} open for {self.breaker_cooldown:.0f}s {reason}"
+            )
+        self._breaker = BREAKER_OPEN
+        self._opened_until = now + self.breaker_cooldown
+        self._breaker_gauge.set(1)
+
+    def stats(self):
+        with self._condition:
+            return dict(
+                self._counters,
+                breaker=self._breaker,
+                concurrency_limit=round(self._limit, 2),
+                in_flight=self._in_flight,
+                tokens=round(self._tokens, 2),
+                rpm=round(self.rate * 60, 1),
+                max_concurrency=self.max_concurrency
+            )
+
+
+class AdmissionControl:
+    """Registry of per-model admission controllers shared by all threads of a worker."""
+
+    def __init__(self, enabled=ADMISSION_ENABLED):
+        self.enabled = enabled
+        self._models = {}
+
+    def register(self, name, rpm, max_concurrency, **options):
+        self._models[name] = ModelAdmission(name, rpm, max_concurrency, **options)
+        return self._models[name]
+
+    @contextmanager
+    def admit(self, name):
+        model = self._models.get(name) if self.enabled else None
+        if model is None:
+            yield
+            return
+        with model.admit():
+            yield
+
+    def stats(self):
+        return {name: model.stats() for name, model in self._models.items()}
+
+
+admission_control = AdmissionControl()
@@ -0,0 +1,146 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import timezone
+from flask import current_app, g, request
+from werkzeug.security import check_password_hash
+from src.services.metrics import InstrumentedThreadPoolExecutor
+
+# --- Configuration ---
+AUTH_TOKEN_TTL_SECONDS = int(os.getenv('AUTH_TOKEN_TTL_SECONDS', str(24 * 3600)))
+# Bump to revoke every token issued under the previous version.
+AUTH_TOKEN_VERSION = int(os.getenv('AUTH_TOKEN_VERSION', '1'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_TIMEOUT_SECONDS = 10
+
+# Password hashing is deliberately slow; a small dedicated pool caps how many
+# checks burn CPU at once. The request thread still waits for its check, so
+# logins beyond the pool's capacity are turned away rather than queued forever.
+password_executor = InstrumentedThreadPoolExecutor('password-hash', PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+
+class TokenError(Exception):
+    """The token is malformed, tampered with, expired or revoked."""
+
+
+class PasswordCheckBusy(Exception):
+    """The password could not be checked within PASSWORD_HASH_TIMEOUT_SECONDS."""
+
+
+class Identity:
+    """The verified claims of an auth token."""
+
+    def __init__(self, user_id, role, tier, access_expires_at, expires_at):
+        self.user_id = user_id
+        self.role = role
+        self.tier = tier
+        self.access_expires_at = access_expires_at
+        self.expires_at = expires_at
+
+    def has_access(self, now=None):
+        if self.role == 'admin':
+            return True
+        return self.access_expires_at is not None and (now or time.time()) < self.access_expires_at
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def init_auth_tokens(app):
+    """Loads AUTH_TOKEN_SECRET into the app config; refuses to start without one."""
+    secret = os.getenv('AUTH_TOKEN_SECRET')
+    if not secret:
+        raise RuntimeError("AUTH_TOKEN_SECRET must be set; auth tokens cannot be signed without it")
+    app.config['AUTH_TOKEN_SECRET'] = secret
+
+
+def _secret():
+    return current_app.config['AUTH_TOKEN_SECRET'].encode('utf-8')
+
+
+def _sign(body):
+    return _b64encode(hmac.new(_secret(), body.encode('ascii'), hashlib.sha256).digest())
+
+
+def _epoch(naive_utc):
+    return naive_utc.replace(tzinfo=timezone.utc).timestamp()
+
+
+def access_expiry(user):
+    """Epoch time at which the user's current trial or subscription ends, if any."""
+    if user.subscription_status == 'trialing' and user.trial_end_date:
+        return _epoch(user.trial_end_date)
+    if user.subscription_status == 'active' and user.subscription_end_date:
+        return _epoch(user.subscription_end_date)
+    return None
+
+
+def issue_token(user, now=None):
+    """Returns `<payload>.<signature>`: an HMAC-SHA256 over the user's id, role, tier and access expiry."""
+    now = now or time.time()
+    access_expires_at = access_expiry(user)
+    claims = {
+        'uid': user.id,
+        'role': user.role,
+        'tier': user.subscription_tier,
+        'acc': access_expires_at,
+        'exp': int(now + AUTH_TOKEN_TTL_SECONDS),
+        'v': AUTH_TOKEN_VERSION
+    }
+    body = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{body}.{_sign(body)}"
+
+
+def verify_token(token, now=None):
+    """Checks the signature, version and expiry without touching the database."""
+    try:
+        body, signature = token.split('.')
+    except (AttributeError, ValueError):
+        raise TokenError("Malformed token")
+    # Issued tokens are base64url; anything else would fail to encode for signing.
+    if not token.isascii():
+        raise TokenError("Malformed token")
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise TokenError("Invalid token signature")
+    try:
+        claims = json.loads(_b64decode(body))
+    except ValueError:
+        raise TokenError("Malformed token")
+    if claims.get('v') != AUTH_TOKEN_VERSION:
+        raise TokenError("Token has been revoked")
+    if claims['exp'] <= (now or time.time()):
+        raise TokenError("Token has expired")
+    return Identity(claims['uid'], claims['role'], claims['tier'], claims['acc'], claims['exp'])
+
+
+def load_request_identity():
+    """before_request hook: exposes a valid bearer token as `g.identity` (None otherwise)."""
+    g.identity = None
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return
+    try:
+        g.identity = verify_token(header[len('Bearer '):].strip())
+    except TokenError as e:
+        logging.debug(f"Ignoring bearer token: {e}")
+
+
+def verify_password(password_hash, password):
+    """Runs werkzeug's hash check on the password pool; raises PasswordCheckBusy if it is saturated."""
+    future = password_executor.submit(check_password_hash, password_hash, password or '')
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        # Drop the check if it is still queued so it does not add to the backlog.
+        future.cancel()
+        raise PasswordCheckBusy("Password check timed out")
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+from datetime import datetime
+from flask import Response, request
+from src.models.user import User, db
+from src.serializers.user import access_flags, dumps
+
+# Just enough of the row to decide whether a cached copy is still current.
+VALIDATOR_COLUMNS = (
+    User.id, User.updated_at, User.role, User.subscription_status,
+    User.trial_end_date, User.subscription_end_date
+)
+EPOCH = datetime(1970, 1, 1)
+# The client must revalidate on every use, but may keep the copy to do so.
+USER_CACHE_CONTROL = 'private, no-cache'
+PLANS_CACHE_CONTROL = 'public, max-age=300'
+
+
+def load_validator_row(user_id):
+    """Selects only VALIDATOR_COLUMNS for the user, or returns None if there is no such user."""
+    return db.session.query(*VALIDATOR_COLUMNS).filter(User.id == user_id).first()
+
+
+def user_validators(row, now, variant='', boundaries=()):
+    """Returns (etag, last_modified) for a user resource.
+
+    The ETag covers `updated_at`, the access flags at `now` and a
+    route-specific `variant` (the view name, say), so a trial or subscription
+    lapsing changes it even though no column was written. Last-Modified is the
+    later of `updated_at` and any passed expiry or extra `boundaries`.
+    """
+    flags = access_flags(row, now)
+    last_modified = row.updated_at or EPOCH
+    for boundary in (row.trial_end_date, row.subscription_end_date) + tuple(boundaries):
+        if boundary and last_modified < boundary <= now:
+            last_modified = boundary
+    state = f"{row.id}:{(row.updated_at or EPOCH).isoformat()}:{flags}:{variant}"
+    return hashlib.sha1(state.encode('utf-8')).hexdigest(), last_modified
+
+
+def is_not_modified(etag, last_modified):
+    """Evaluates If-None-Match (preferred) or If-Modified-Since against the validators."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def with_validators(response, etag, last_modified, cache_control=USER_CACHE_CONTROL):
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def not_modified(etag, last_modified, cache_control=USER_CACHE_CONTROL):
+    return with_validators(Response(status=304), etag, last_modified, cache_control)
+
+
+class PrecompressedPayload:
+    """A JSON body encoded and gzipped once, served with a stable content-hash ETag."""
+
+    def __init__(self, payload, cache_control=PLANS_CACHE_CONTROL):
+        self.body = dumps(payload)
+        # mtime=0 keeps the gzip bytes identical across restarts and workers.
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()
+        self.cache_control = cache_control
+
+    def response(self):
+        if request.if_none_match and request.if_none_match.contains_weak(self.etag):
+            response = Response(status=304)
+        elif 'gzip' in request.accept_encodings:
+            response = Response(self.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag, weak=True)
+        response.headers['Cache-Control'] = self.cache_control
+        response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,70 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, delete
+from src.database import db
+from src.models.user import User
+from src.services.periodic import PeriodicJob
+
+# --- Configuration ---
+DEMO_ROLE = 'demo'
+DEMO_USER_TTL_HOURS = int(os.getenv('DEMO_USER_TTL_HOURS', '24'))
+DEMO_SWEEP_BATCH_SIZE = int(os.getenv('DEMO_SWEEP_BATCH_SIZE', '500'))
+DEMO_SWEEP_MAX_BATCHES = int(os.getenv('DEMO_SWEEP_MAX_BATCHES', '100'))
+DEMO_SWEEPER_ENABLED = os.getenv('DEMO_SWEEPER', 'false').lower() in ('1', 'true', 'yes')
+DEMO_SWEEP_INTERVAL_SECONDS = int(os.getenv('DEMO_SWEEP_INTERVAL_SECONDS', '900'))
+
+
+def demo_expiry(created_at):
+    return created_at + timedelta(hours=DEMO_USER_TTL_HOURS)
+
+
+def sweep_expired_demo_users(now=None, batch_size=DEMO_SWEEP_BATCH_SIZE, max_batches=DEMO_SWEEP_MAX_BATCHES):
+    """Deletes demo users older than DEMO_USER_TTL_HOURS, `batch_size` rows per transaction.
+
+    Candidates come from a range scan of the (role, created_at) index, and
+    each batch is a short DELETE by primary key, so request threads never wait
+    behind one long delete. At most `max_batches` batches run per call; the
+    rest are picked up by the next sweep.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=DEMO_USER_TTL_HOURS)
+    started = time.perf_counter()
+    rows = batches = 0
+    while batches < max_batches:
+        ids = db.session.execute(
+            select(User.id)
+            .where(User.role == DEMO_ROLE, User.created_at <= cutoff)
+            .order_by(User.created_at)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        result = db.session.execute(
+            delete(User).where(User.id.in_(ids), User.role == DEMO_ROLE)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        rows += result.rowcount
+        batches += 1
+
+    elapsed = time.perf_counter() - started
+    logging.info(f"Demo user sweep: reclaimed {rows} rows in {batches} batches, {elapsed:.2f}s")
+    return {'rows': rows, 'batches': batches, 'seconds': round(elapsed, 3)}
+
+
+def start_demo_sweeper(app, interval=DEMO_SWEEP_INTERVAL_SECONDS):
+    """Started by the gunicorn workers (see gunicorn.conf.py); only one of them sweeps at a time."""
+    return PeriodicJob(app, sweep_expired_demo_users, interval, 'demo-sweeper', single_owner=True).start()
+
+
+@click.command('sweep-demo-users')
+@click.option('--batch-size', default=DEMO_SWEEP_BATCH_SIZE, show_default=True, help='Users deleted per transaction.')
+@click.option('--max-batches', default=DEMO_SWEEP_MAX_BATCHES, show_default=True)
+@with_appcontext
+def sweep_demo_users_command(batch_size, max_batches):
+    """Delete demo users whose TTL has passed."""
+    report = sweep_expired_demo_users(batch_size=batch_size, max_batches=max_batches)
+    click.echo(f"Reclaimed {report['rows']} demo users in {report['batches']} batches ({report['seconds']}s)")
@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+
+# --- Configuration ---
+PROJECT_ID = os.getenv('GOOGLE_PROJECT_ID', 'final-myaimediamgr-website')
+LOCATION = "us-central1"
+WARM_CLIENTS = os.getenv('WARM_CLIENTS', 'true').lower() in ('1', 'true', 'yes')
+
+
+class LazyClients:
+    """Creates each Google Cloud client on first use instead of at import time.
+
+    The SDK modules are imported inside the factories, so neither their import
+    nor their credential lookup is paid before gunicorn can serve requests.
+    `override` installs a ready-made client (a fake, in load tests).
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._clients = {}
+        self._build_locks = {}
+        self._init_seconds = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._build_locks.setdefault(name, threading.Lock())
+
+    def override(self, name, client):
+        with self._lock:
+            self._build_locks.setdefault(name, threading.Lock())
+            self._clients[name] = client
+
+    def get(self, name):
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        build_lock = self._build_locks.get(name)
+        if build_lock is None:
+            raise KeyError(f"No client registered under '{name}'")
+        with build_lock:
+            client = self._clients.get(name)
+            if client is None:
+                started = time.perf_counter()
+                client = self._factories[name]()
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self._init_seconds[name] = elapsed
+                    self._clients[name] = client
+                logging.info(f"Initialized client '{name}' in {elapsed:.2f}s")
+        return client
+
+    def warm_up(self, names=None):
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f"Failed to initialize client '{name}': {e}", exc_info=True)
+
+    def warm_up_in_background(self, names=None):
+        thread = threading.Thread(target=self.warm_up, args=(names,), name='client-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {
+                    'ready': name in self._clients,
+                    'init_seconds': round(self._init_seconds[name], 4) if name in self._init_seconds else None
+                }
+                for name in self._build_locks
+            }
+
+
+def _init_vertex():
+    import vertexai
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return vertexai
+
+
+def _storage_client():
+    from google.cloud import storage
+    return storage.Client()
+
+
+def _firestore_client():
+    from google.cloud import firestore
+    return firestore.Client(project=PROJECT_ID)
+
+
+gcp_clients = LazyClients()
+gcp_clients.register('vertex', _init_vertex)
+gcp_clients.register('storage', _storage_client)
+gcp_clients.register('firestore', _firestore_client)
+
+
+def init_vertex():
+    """Runs vertexai.init() once per worker; model factories call this first."""
+    return gcp_clients.get('vertex')
+
+
+def get_storage_client():
+    return gcp_clients.get('storage')
+
+
+def get_firestore_client():
+    return gcp_clients.get('firestore')
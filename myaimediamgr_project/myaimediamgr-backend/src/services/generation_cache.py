@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+# --- Configuration ---
+GENERATION_CACHE_ENABLED = os.getenv('GENERATION_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv('GENERATION_CACHE_MAX_ENTRIES', '512'))
+GENERATION_CACHE_TTL_SECONDS = int(os.getenv('GENERATION_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+GENERATION_CACHE_COLLECTION = 'generation_cache'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(prompt):
+    return _WHITESPACE.sub(' ', (prompt or '').strip().lower())
+
+
+def make_cache_key(prompt, model_id, platforms, caption_theme=None, user_id=None):
+    """Content address for a generation: same user, brief, model and platforms give the same key.
+
+    The user id is part of the key, so one user's generated media is never served to another.
+    """
+    parts = [
+        str(user_id),
+        normalize_prompt(prompt),
+        model_id,
+        ','.join(sorted(set(platforms or []))),
+        normalize_prompt(caption_theme)
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class FirestoreCacheStore:
+    """Persistent tier: keeps the GCS object reference and caption, never the media bytes.
+
+    Entries carry an `expires_at` field so a Firestore TTL policy on that field
+    can delete them server-side; expired entries are also ignored on read.
+    """
+
+    def __init__(self, get_client, collection=GENERATION_CACHE_COLLECTION):
+        # A zero-argument callable, so the Firestore client is only created when first needed.
+        self._get_client = get_client
+        self._collection = collection
+
+    def get(self, key):
+        doc_ref = self._get_client().collection(self._collection).document(key)
+        snapshot = doc_ref.get()
+        if not snapshot.exists:
+            return None
+        entry = snapshot.to_dict()
+        if entry.get('expires_at', 0) <= time.time():
+            doc_ref.delete()
+            return None
+        return entry
+
+    def put(self, key, entry):
+        self._get_client().collection(self._collection).document(key).set(entry)
+
+
+class GenerationCache:
+    """Two-tier cache of generation results: an in-process LRU in front of a persistent store."""
+
+    def __init__(self, enabled=GENERATION_CACHE_ENABLED, max_entries=GENERATION_CACHE_MAX_ENTRIES,
+                 ttl_seconds=GENERATION_CACHE_TTL_SECONDS, persistent_store=None):
+        self.enabled = enabled
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._store = persistent_store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0, 'persistent_hits': 0, 'misses': 0,
+            'bypassed': 0, 'stores': 0, 'evictions': 0, 'errors': 0
+        }
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return entry
+                del self._entries[key]
+
+        if self._store is not None:
+            try:
+                entry = self._store.get(key)
+            except Exception as e:
+                logging.error(f"Generation cache lookup failed: {e}", exc_info=True)
+                entry = None
+                self._count('errors')
+            if entry is not None:
+                self._remember(key, entry)
+                self._count('persistent_hits')
+                return entry
+
+        self._count('misses')
+        return None
+
+    def put(self, key, gcs_uri, media_type, text):
+        if not self.enabled or not gcs_uri:
+            return
+        now = time.time()
+        entry = {
+            'gcs_uri': gcs_uri,
+            'media_type': media_type,
+            'text': text,
+            'created_at': now,
+            'expires_at': now + self._ttl_seconds
+        }
+        self._remember(key, entry)
+        self._count('stores')
+        if self._store is not None:
+            try:
+                self._store.put(key, entry)
+            except Exception as e:
+                logging.error(f"Generation cache store failed: {e}", exc_info=True)
+                self._count('errors')
+
+    def record_bypass(self):
+        self._count('bypassed')
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['memory_hits'] + self._counters['persistent_hits'] + self._counters['misses']
+            hits = lookups - self._counters['misses']
+            return dict(self._counters, enabled=self.enabled, entries=len(self._entries),
+                        hit_ratio=round(hits / lookups, 4) if lookups else None)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
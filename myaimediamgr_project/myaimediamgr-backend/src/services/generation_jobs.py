@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+import uuid
+import logging
+from src.services.metrics import InstrumentedThreadPoolExecutor
+
+# --- Configuration ---
+# Workers are deliberately fewer than the gunicorn threads so that long Veo
+# jobs can never occupy every request thread at once.
+GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', '2'))
+GENERATION_MAX_PENDING = int(os.getenv('GENERATION_MAX_PENDING', '20'))
+GENERATION_JOB_RETENTION_SECONDS = int(os.getenv('GENERATION_JOB_RETENTION_SECONDS', '3600'))
+
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+
+class QueueFullError(Exception):
+    """Raised when the generation queue cannot accept more work."""
+
+
+class GenerationJob:
+    def __init__(self, user_id, content_type):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.content_type = content_type
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.version = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def is_finished(self):
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'content_type': self.content_type,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class GenerationJobQueue:
+    """Runs generation work on a bounded pool and tracks job state in memory.
+
+    Job state lives in the worker process, so status polling must reach the
+    same gunicorn worker that accepted the job (the default single-worker
+    deployment in entrypoint.sh).
+    """
+
+    def __init__(self, max_workers=GENERATION_WORKERS, max_pending=GENERATION_MAX_PENDING,
+                 retention_seconds=GENERATION_JOB_RETENTION_SECONDS):
+        self._executor = InstrumentedThreadPoolExecutor('generation', max_workers, thread_name_prefix='generation')
+        self._max_pending = max_pending
+        self._retention_seconds = retention_seconds
+        self._jobs = {}
+        self._changed = threading.Condition()
+
+    def submit(self, app, user_id, content_type, work, on_failure=None):
+        """Queues `work()` to run inside an app context and returns the job.
+
+        `on_failure(job)` runs in the same app context when `work` raises, which
+        is where callers hand back anything reserved at submit time.
+        """
+        with self._changed:
+            self._prune_locked()
+            active = sum(1 for job in self._jobs.values() if not job.is_finished())
+            if active >= self._max_pending:
+                raise QueueFullError("Generation queue is full, please retry shortly.")
+            job = GenerationJob(user_id, content_type)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, app, job, work, on_failure)
+        logging.info(f"Queued generation job {job.id} ({content_type}) for user {user_id}")
+        return job
+
+    def get(self, job_id, user_id):
+        """The job, if it exists and was submitted by `user_id`; None otherwise."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+        if job is None or user_id is None or str(job.user_id) != str(user_id):
+            return None
+        return job
+
+    def wait_for_update(self, job_id, seen_version, timeout):
+        """Blocks until the job moves past `seen_version` or `timeout` elapses."""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job.version != seen_version:
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job
+                self._changed.wait(remaining)
+
+    def _run(self, app, job, work, on_failure):
+        self._update(job, status='running', started_at=time.time())
+        with app.app_context():
+            try:
+                result = work()
+            except Exception as e:
+                logging.error(f"Generation job {job.id} failed: {e}", exc_info=True)
+                if on_failure is not None:
+                    try:
+                        on_failure(job)
+                    except Exception:
+                        logging.error(f"Failure handler for job {job.id} raised", exc_info=True)
+                self._update(job, status='failed', error=str(e), finished_at=time.time())
+                return
+        self._update(job, status='succeeded', result=result, finished_at=time.time())
+        logging.info(f"Generation job {job.id} finished in {job.finished_at - job.created_at:.1f}s")
+
+    def _update(self, job, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _prune_locked(self):
+        cutoff = time.time() - self._retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.is_finished() and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+generation_jobs = GenerationJobQueue()
@@ -0,0 +1,256 @@
+import os
+import hmac
+import mmap
+import time
+import uuid
+import hashlib
+import logging
+import mimetypes
+from datetime import datetime, timezone
+from urllib.parse import quote, unquote, urlsplit
+from flask import jsonify, request, send_file
+from src.services.gcp_clients import get_storage_client
+from src.services.media_upload import upload_stream, as_file_object, CountingReader, UPLOAD_CHUNK_SIZE
+from src.services.metrics import stage_timer, UPLOAD_BYTES
+from src.services.signed_urls import gcs_uri_from_url, is_media_bucket_uri, MEDIA_BUCKET
+
+# --- Configuration ---
+MEDIA_STORAGE_BACKEND = os.getenv('MEDIA_STORAGE_BACKEND', 'gcs').lower()  # 'gcs' or 'local'
+MEDIA_LOCAL_ROOT = os.getenv(
+    'MEDIA_LOCAL_ROOT', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'media')
+)
+MEDIA_URL_PREFIX = '/media'
+LOCAL_URI_SCHEME = 'local://'
+
+
+class MediaStorage:
+    """Where generated media lives.
+
+    Objects are addressed by key (e.g. `generated-media/image-....png`).
+    `uri(key)` is the durable reference stored with posts (`media_gcs_uri`),
+    and `sign_url(key, expires_at)` returns a URL browsers can fetch until the
+    `expires_at` epoch timestamp. `get_range` takes an inclusive byte range,
+    like an HTTP Range header.
+    """
+
+    def uri(self, key):
+        raise NotImplementedError
+
+    def key_from_uri(self, uri):
+        """The key of a URI produced by this backend, or None."""
+        raise NotImplementedError
+
+    def uri_from_url(self, url):
+        """Recovers the storage URI from a URI or from a URL previously signed by this backend."""
+        raise NotImplementedError
+
+    def direct_output_uri(self, prefix):
+        """A URI prefix Vertex AI can write output to directly, or None if it must be uploaded."""
+        return None
+
+    def put_stream(self, key, source, content_type, chunk_size=None):
+        """Stores bytes, a file object or an iterable of chunks; returns the byte count."""
+        raise NotImplementedError
+
+    def get_range(self, key, start=0, end=None):
+        raise NotImplementedError
+
+    def sign_url(self, key, expires_at):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class GCSMediaStorage(MediaStorage):
+    def __init__(self, bucket_name, get_client):
+        # A zero-argument callable, so the storage client is only created when first needed.
+        self.bucket_name = bucket_name
+        self._get_client = get_client
+
+    def _blob(self, key, chunk_size=None):
+        return self._get_client().bucket(self.bucket_name).blob(key, chunk_size=chunk_size)
+
+    def uri(self, key):
+        return f"gs://{self.bucket_name}/{key}"
+
+    def key_from_uri(self, uri):
+        if is_media_bucket_uri(uri, self.bucket_name):
+            return uri[len(f"gs://{self.bucket_name}/"):]
+        return None
+
+    def uri_from_url(self, url):
+        return gcs_uri_from_url(url, self.bucket_name)
+
+    def direct_output_uri(self, prefix):
+        return f"gs://{self.bucket_name}/{prefix.strip('/')}/"
+
+    def put_stream(self, key, source, content_type, chunk_size=None):
+        return upload_stream(self._get_client().bucket(self.bucket_name), key, source, content_type, chunk_size)
+
+    def get_range(self, key, start=0, end=None):
+        return self._blob(key).download_as_bytes(start=start, end=end)
+
+    def sign_url(self, key, expires_at):
+        with stage_timer('url_signing'):
+            return self._blob(key).generate_signed_url(
+                version="v4",
+                expiration=datetime.fromtimestamp(expires_at, timezone.utc),
+                method="GET"
+            )
+
+    def exists(self, key):
+        return self._blob(key).exists()
+
+    def delete(self, key):
+        from google.api_core import exceptions
+
+        try:
+            self._blob(key).delete()
+        except exceptions.NotFound:
+            pass
+
+
+class LocalMediaStorage(MediaStorage):
+    """Keeps media on local disk for self-hosted and development deployments.
+
+    Signed URLs point at this app's /media/<key> route and carry an
+    HMAC-SHA256 of the key and expiry, so they can be verified without any
+    lookup. The route serves files with send_file (sendfile under gunicorn,
+    conditional and Range requests for video seeking).
+    """
+
+    def __init__(self, root, url_prefix=MEDIA_URL_PREFIX, secret=None):
+        self.root = os.path.realpath(root)
+        self.url_prefix = url_prefix
+        self.secret = secret
+
+    def path(self, key):
+        """Absolute path of `key`; rejects keys that would escape the storage root."""
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not key or os.path.isabs(key) or not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid media key: {key}")
+        return path
+
+    def uri(self, key):
+        return f"{LOCAL_URI_SCHEME}{key}"
+
+    def key_from_uri(self, uri):
+        if uri and uri.startswith(LOCAL_URI_SCHEME) and len(uri) > len(LOCAL_URI_SCHEME):
+            return uri[len(LOCAL_URI_SCHEME):]
+        return None
+
+    def uri_from_url(self, url):
+        if not url:
+            return None
+        if url.startswith(LOCAL_URI_SCHEME):
+            return url
+        path = urlsplit(url).path
+        if path.startswith(self.url_prefix + '/'):
+            return self.uri(unquote(path[len(self.url_prefix) + 1:]))
+        return None
+
+    def put_stream(self, key, source, content_type, chunk_size=None):
+        chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        reader = CountingReader(as_file_object(source))
+        # Written under a temporary name and renamed, so readers never see a partial file.
+        partial = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            with stage_timer('local_upload'), open(partial, 'wb') as f:
+                while True:
+                    chunk = reader.read(chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        UPLOAD_BYTES.labels(content_type).inc(reader.bytes_read)
+        logging.info(f"Stored {reader.bytes_read} bytes at {path}")
+        return reader.bytes_read
+
+    def get_range(self, key, start=0, end=None):
+        with open(self.path(key), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            # Map the file instead of reading it so only the requested pages are faulted in.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start:None if end is None else end + 1]
+
+    def _signature(self, key, expires_at):
+        message = f"{key}\n{int(expires_at)}".encode('utf-8')
+        return hmac.new(self.secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+    def sign_url(self, key, expires_at):
+        if not self.secret:
+            raise RuntimeError("Local media storage has no signing secret; set MEDIA_URL_SECRET")
+        return f"{self.url_prefix}/{quote(key)}?expires={int(expires_at)}&signature={self._signature(key, expires_at)}"
+
+    def verify(self, key, expires_at, signature, now=None):
+        if not self.secret or expires_at is None or expires_at <= (now or time.time()):
+            return False
+        return hmac.compare_digest(self._signature(key, expires_at), signature or '')
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+def create_media_storage(backend=MEDIA_STORAGE_BACKEND):
+    if backend == 'gcs':
+        return GCSMediaStorage(MEDIA_BUCKET, get_storage_client)
+    if backend == 'local':
+        return LocalMediaStorage(MEDIA_LOCAL_ROOT, secret=os.getenv('MEDIA_URL_SECRET'))
+    raise ValueError(f"Unknown MEDIA_STORAGE_BACKEND: {backend}")
+
+
+media_storage = create_media_storage()
+
+
+# --- Flask integration ---
+
+def serve_local_media(key):
+    """Serves a file of the local backend to the holder of a valid signed URL."""
+    expires_at = request.args.get('expires', type=int)
+    if not media_storage.verify(key, expires_at, request.args.get('signature')):
+        return jsonify({'success': False, 'error': 'Invalid or expired media URL'}), 403
+    try:
+        path = media_storage.path(key)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Media not found'}), 404
+    if not os.path.isfile(path):
+        return jsonify({'success': False, 'error': 'Media not found'}), 404
+
+    response = send_file(path, mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+                         conditional=True, max_age=None)
+    # Cacheable by the browser for as long as the signature stays valid.
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = max(0, expires_at - int(time.time()))
+    return response
+
+
+def init_media_storage(app, limiter=None):
+    """Checks the local backend has MEDIA_URL_SECRET and registers the /media route it signs URLs for."""
+    if not isinstance(media_storage, LocalMediaStorage):
+        return
+    media_storage.secret = media_storage.secret or os.getenv('MEDIA_URL_SECRET')
+    if not media_storage.secret:
+        raise RuntimeError("MEDIA_URL_SECRET must be set when MEDIA_STORAGE_BACKEND=local")
+    view = serve_local_media
+    if limiter is not None:
+        view = limiter.exempt(view)
+    app.add_url_rule(f"{MEDIA_URL_PREFIX}/<path:key>", 'media', view)
+    logging.info(f"Serving local media from {media_storage.root}")
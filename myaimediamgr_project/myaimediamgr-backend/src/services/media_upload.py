@@ -0,0 +1,129 @@
+import io
+import os
+import time
+import resource
+import logging
+from contextlib import contextmanager
+from src.services.metrics import stage_timer, UPLOAD_BYTES
+
+# GCS resumable uploads require chunk sizes that are multiples of 256 KiB.
+GCS_CHUNK_MULTIPLE = 256 * 1024
+
+
+def _configured_chunk_size():
+    requested = int(os.getenv('UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+    return max(GCS_CHUNK_MULTIPLE, requested // GCS_CHUNK_MULTIPLE * GCS_CHUNK_MULTIPLE)
+
+
+UPLOAD_CHUNK_SIZE = _configured_chunk_size()
+
+
+class IterableReader(io.RawIOBase):
+    """Read-only file object over an iterable of byte chunks, holding at most one chunk."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class CountingReader(io.RawIOBase):
+    """Passes reads through to `source` while counting the bytes handed out.
+
+    Reads are filled up to the requested size, because the resumable upload
+    treats a short read as the end of the stream.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_read
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            data = self._source.read()
+        else:
+            parts = []
+            remaining = size
+            while remaining > 0:
+                part = self._source.read(remaining)
+                if not part:
+                    break
+                parts.append(part)
+                remaining -= len(part)
+            data = parts[0] if len(parts) == 1 else b''.join(parts)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def as_file_object(source):
+    """Accepts bytes, a readable file object or an iterable of byte chunks."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # BytesIO shares the buffer of an immutable bytes object instead of copying it.
+        return io.BytesIO(source)
+    if hasattr(source, 'read'):
+        return source
+    return IterableReader(source)
+
+
+def upload_stream(bucket, blob_name, source, content_type, chunk_size=None):
+    """Uploads `source` to GCS with a chunked resumable upload and returns the byte count.
+
+    Only one chunk of the source is buffered at a time, so memory stays bounded
+    by `chunk_size` regardless of the media size.
+    """
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    blob = bucket.blob(blob_name, chunk_size=chunk_size)
+    reader = CountingReader(as_file_object(source))
+    started = time.perf_counter()
+    with stage_timer('gcs_upload'):
+        blob.upload_from_file(reader, content_type=content_type)
+    elapsed = time.perf_counter() - started
+    UPLOAD_BYTES.labels(content_type).inc(reader.bytes_read)
+    logging.info(f"Uploaded {reader.bytes_read} bytes to gs://{bucket.name}/{blob_name} "
+                 f"in {elapsed:.2f}s ({chunk_size // 1024} KiB chunks)")
+    return reader.bytes_read
+
+
+def _current_rss_kib():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def log_peak_memory(label):
+    """Logs the process peak RSS, and how much this block raised it, once the block exits."""
+    peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        yield
+    finally:
+        peak_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        logging.info(f"{label}: peak RSS {peak_after // 1024} MiB "
+                     f"(+{(peak_after - peak_before) // 1024} MiB during request), "
+                     f"current RSS {(_current_rss_kib() or 0) // 1024} MiB")
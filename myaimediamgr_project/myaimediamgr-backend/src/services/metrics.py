@@ -0,0 +1,178 @@
+import os
+import hmac
+import time
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import Response, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.services.tracing import span, propagate
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+# With several gunicorn workers each process writes its samples to files in
+# PROMETHEUS_MULTIPROC_DIR (set before this module is imported) and /metrics
+# aggregates all of them; see gunicorn.conf.py for cleaning up dead workers.
+MULTIPROCESS_MODE = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response (excluding streamed bodies).',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+STAGE_LATENCY = Histogram(
+    'generation_stage_duration_seconds', 'Time spent in each stage of content generation.',
+    ['stage', 'outcome'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300)
+)
+UPLOAD_BYTES = Counter('media_upload_bytes_total', 'Bytes streamed to GCS.', ['content_type'])
+DB_QUERIES = Histogram(
+    'db_queries_per_request', 'SQL statements executed while handling one request.', ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+ADMISSION_WAIT = Histogram(
+    'model_admission_wait_seconds', 'Time a model call waited for admission, by outcome.',
+    ['model', 'outcome'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+)
+ADMISSION_REJECTED = Counter(
+    'model_admission_rejected_total', 'Model calls refused by admission control.', ['model', 'reason']
+)
+ADMISSION_THROTTLED = Counter(
+    'model_admission_throttled_total', 'Admitted model calls that ended in ResourceExhausted.', ['model']
+)
+ADMISSION_CONCURRENCY_LIMIT = Gauge(
+    'model_admission_concurrency_limit', 'Current AIMD concurrency limit per model.', ['model'],
+    multiprocess_mode='liveall'
+)
+ADMISSION_BREAKER_OPEN = Gauge(
+    'model_admission_breaker_open', '1 while the model circuit breaker is open.', ['model'],
+    multiprocess_mode='liveall'
+)
+EXECUTOR_WORKERS = Gauge(
+    'executor_max_workers', 'Configured threads per pool.', ['pool'], multiprocess_mode='livesum'
+)
+EXECUTOR_ACTIVE = Gauge(
+    'executor_active_tasks', 'Tasks currently running per pool.', ['pool'], multiprocess_mode='livesum'
+)
+EXECUTOR_QUEUED = Gauge(
+    'executor_queued_tasks', 'Tasks waiting for a free thread per pool.', ['pool'], multiprocess_mode='livesum'
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """Observes the duration of one generation stage, labelled by whether it raised.
+
+    The stage is also recorded as a span of the current trace.
+    """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        with span(stage):
+            yield
+        outcome = 'ok'
+    finally:
+        STAGE_LATENCY.labels(stage, outcome).observe(time.perf_counter() - started)
+
+
+class InstrumentedThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor that reports its queued and running task counts.
+
+    Submitted tasks also run inside the submitter's current trace span.
+    """
+
+    def __init__(self, pool, max_workers, thread_name_prefix=''):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._queued = EXECUTOR_QUEUED.labels(pool)
+        self._active = EXECUTOR_ACTIVE.labels(pool)
+        self._workers = EXECUTOR_WORKERS.labels(pool)
+        self._workers.inc(max_workers)
+        self._max_workers_reported = max_workers
+
+    def submit(self, fn, /, *args, **kwargs):
+        self._queued.inc()
+        try:
+            future = super().submit(self._run, propagate(fn), args, kwargs)
+        except Exception:
+            self._queued.dec()
+            raise
+        # A task cancelled before it started never reaches _run.
+        future.add_done_callback(lambda f: self._queued.dec() if f.cancelled() else None)
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        # Per-request pools are shut down after use; stop counting their threads.
+        if self._max_workers_reported:
+            self._workers.dec(self._max_workers_reported)
+            self._max_workers_reported = 0
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def _run(self, fn, args, kwargs):
+        self._queued.dec()
+        self._active.inc()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._active.dec()
+
+
+# --- Request instrumentation ---
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._db_queries = g.get('_db_queries', 0) + 1
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def _start_timer():
+    g._request_started = time.perf_counter()
+    g._db_queries = 0
+
+
+def _observe_request(response):
+    started = g.get('_request_started')
+    if started is not None:
+        route = _route_label()
+        REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.perf_counter() - started)
+        DB_QUERIES.labels(route).observe(g.get('_db_queries', 0))
+    return response
+
+
+def metrics_view(token):
+    header = request.headers.get('Authorization', '')
+    if not (header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):].strip(), token)):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, limiter=None):
+    """Registers the request hooks and, when METRICS_TOKEN is set, the /metrics endpoint.
+
+    Scrapers authenticate with `Authorization: Bearer <METRICS_TOKEN>`; without
+    a token configured the endpoint is not exposed at all.
+    """
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+    token = os.getenv('METRICS_TOKEN')
+    if not token:
+        logging.info("METRICS_TOKEN is not set; /metrics is disabled")
+        return
+
+    def view():
+        return metrics_view(token)
+
+    if limiter is not None:
+        view = limiter.exempt(view)
+    app.add_url_rule('/metrics', 'metrics', view)
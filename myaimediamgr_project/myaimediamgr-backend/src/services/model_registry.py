@@ -0,0 +1,108 @@
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+
+class ModelStats:
+    def __init__(self):
+        self.init_count = 0
+        self.init_seconds = 0.0
+        self.call_count = 0
+        self.call_errors = 0
+        self.call_seconds = 0.0
+        self.call_max_seconds = 0.0
+
+    def to_dict(self):
+        return {
+            'init_count': self.init_count,
+            'init_seconds': round(self.init_seconds, 4),
+            'call_count': self.call_count,
+            'call_errors': self.call_errors,
+            'call_seconds_total': round(self.call_seconds, 4),
+            'call_seconds_avg': round(self.call_seconds / self.call_count, 4) if self.call_count else None,
+            'call_seconds_max': round(self.call_max_seconds, 4)
+        }
+
+
+class ModelRegistry:
+    """Builds each Vertex AI model handle once per worker and shares it across threads."""
+
+    def __init__(self):
+        self._factories = {}
+        self._models = {}
+        self._build_locks = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._build_locks.setdefault(name, threading.Lock())
+            self._stats.setdefault(name, ModelStats())
+            self._models.pop(name, None)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        build_lock = self._build_locks.get(name)
+        if build_lock is None:
+            raise KeyError(f"No model registered under '{name}'")
+        with build_lock:
+            model = self._models.get(name)
+            if model is None:
+                started = time.perf_counter()
+                model = self._factories[name]()
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    stats = self._stats[name]
+                    stats.init_count += 1
+                    stats.init_seconds += elapsed
+                    self._models[name] = model
+                logging.info(f"Initialized model handle '{name}' in {elapsed:.2f}s")
+        return model
+
+    @contextmanager
+    def timed_call(self, name):
+        """Records the duration of one call against the named model."""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._stats.setdefault(name, ModelStats())
+                stats.call_count += 1
+                stats.call_seconds += elapsed
+                stats.call_max_seconds = max(stats.call_max_seconds, elapsed)
+                if failed:
+                    stats.call_errors += 1
+
+    def warm_up(self, names=None):
+        """Builds the given (or all registered) handles, logging rather than raising on failure."""
+        for name in names or list(self._factories):
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f"Failed to warm up model '{name}': {e}", exc_info=True)
+
+    def warm_up_in_background(self, names=None):
+        thread = threading.Thread(target=self.warm_up, args=(names,), name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: dict(stats.to_dict(), loaded=name in self._models)
+                for name, stats in self._stats.items()
+            }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,178 @@
+import os
+import time
+import bisect
+import itertools
+import logging
+import threading
+import functools
+from collections import deque
+
+from src.services.pending_posts import decode_cursor, encode_cursor
+
+# --- Configuration ---
+PENDING_LIVE_INDEX_ENABLED = os.getenv('PENDING_LIVE_INDEX', 'false').lower() in ('1', 'true', 'yes')
+PENDING_CHANGE_LOG_SIZE = int(os.getenv('PENDING_CHANGE_LOG_SIZE', '10000'))
+# Minimum gap between attempts to re-attach a listener whose stream has died.
+PENDING_WATCH_RETRY_SECONDS = float(os.getenv('PENDING_WATCH_RETRY_SECONDS', '5'))
+
+
+def _sort_key(created_at, doc_id):
+    # Posts whose server timestamp has not resolved yet sort last.
+    return (created_at.timestamp() if created_at else float('inf'), doc_id)
+
+
+class PendingPostsIndex:
+    """In-memory, ordered copy of the approval queue kept current by a snapshot listener.
+
+    The listener delivers ADDED/MODIFIED/REMOVED changes, which are applied
+    incrementally and numbered with a sequence. Clients pass the last sequence
+    they saw as `since` to fetch only what changed. `apply_changes` accepts any
+    objects shaped like Firestore `DocumentChange`s, so the index can be driven
+    by the emulator or by a local fake.
+
+    If the listener's stream dies the index is emptied and marked not ready,
+    so callers query Firestore directly until `ensure_started` has attached a
+    new listener and its first snapshot has arrived.
+    """
+
+    def __init__(self, enabled=PENDING_LIVE_INDEX_ENABLED, change_log_size=PENDING_CHANGE_LOG_SIZE,
+                 retry_seconds=PENDING_WATCH_RETRY_SECONDS):
+        self.enabled = enabled
+        self.retry_seconds = retry_seconds
+        self._posts = {}
+        self._keys = []
+        self._sequence = 0
+        self._changes = deque(maxlen=change_log_size)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._watch = None
+        self._retry_at = 0.0
+        self._listener = 0
+
+    # --- Listener lifecycle ---
+
+    def ensure_started(self, query_factory):
+        """Attaches the snapshot listener once per worker process, and again after its stream dies."""
+        if self._watch is not None and self._watch.is_active:
+            return
+        with self._lock:
+            if self._watch is not None and not self._watch.is_active:
+                logging.warning("pending_posts snapshot listener stopped; serving from Firestore until it is back")
+                self._detach_locked()
+            if self._watch is None and time.monotonic() >= self._retry_at:
+                self._retry_at = time.monotonic() + self.retry_seconds
+                self._listener += 1
+                try:
+                    self._watch = query_factory().on_snapshot(functools.partial(self._on_snapshot, self._listener))
+                except Exception:
+                    logging.error("Failed to start pending_posts snapshot listener", exc_info=True)
+                    return
+                logging.info("Started pending_posts snapshot listener")
+
+    def stop(self):
+        with self._lock:
+            self._detach_locked()
+
+    def _detach_locked(self):
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                logging.warning("Failed to unsubscribe pending_posts snapshot listener", exc_info=True)
+            self._watch = None
+        # Snapshots still in flight from the old listener are ignored from here on.
+        self._listener += 1
+        # A new listener starts from a full snapshot, so drop the old state. Skipping a
+        # sequence number makes every earlier `since` unreplayable, forcing clients to reset.
+        self._ready.clear()
+        self._posts.clear()
+        self._keys.clear()
+        self._changes.clear()
+        self._sequence += 1
+
+    def is_ready(self):
+        return self._ready.is_set() and self._watch is not None and self._watch.is_active
+
+    def _on_snapshot(self, listener, documents, changes, read_time):
+        try:
+            applied = self.apply_changes(changes, listener)
+        except Exception:
+            logging.error("Failed to apply pending_posts snapshot", exc_info=True)
+            return
+        if applied:
+            self._ready.set()
+
+    # --- Mutation ---
+
+    def apply_changes(self, changes, listener=None):
+        """Applies document changes; returns False if they come from a listener that was since replaced."""
+        with self._lock:
+            if listener is not None and listener != self._listener:
+                return False
+            for change in changes:
+                document = change.document
+                if change.type.name == 'REMOVED':
+                    self._remove_locked(document.id)
+                    op = 'removed'
+                else:
+                    self._remove_locked(document.id)
+                    data = document.to_dict()
+                    data['id'] = document.id
+                    self._posts[document.id] = data
+                    bisect.insort(self._keys, _sort_key(data.get('created_at'), document.id))
+                    op = 'upserted'
+                self._sequence += 1
+                self._changes.append((self._sequence, document.id, op))
+            return True
+
+    def _remove_locked(self, doc_id):
+        existing = self._posts.pop(doc_id, None)
+        if existing is not None:
+            key = _sort_key(existing.get('created_at'), doc_id)
+            index = bisect.bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                del self._keys[index]
+
+    # --- Reads ---
+
+    def page(self, limit, cursor=None, user_id=None, platform=None):
+        """Returns (posts, next_cursor, sequence) for one page in (created_at, id) order."""
+        with self._lock:
+            start = 0
+            if cursor:
+                start = bisect.bisect_right(self._keys, _sort_key(*decode_cursor(cursor)))
+            posts = []
+            next_cursor = None
+            for key in itertools.islice(self._keys, start, None):
+                post = self._posts[key[1]]
+                if user_id is not None and post.get('user_id') != user_id:
+                    continue
+                if platform and platform not in (post.get('platforms') or ()):
+                    continue
+                if len(posts) == limit:
+                    last = posts[-1]
+                    next_cursor = encode_cursor(last.get('created_at'), last['id'])
+                    break
+                posts.append(dict(post))
+            return posts, next_cursor, self._sequence
+
+    def changes_since(self, since):
+        """Returns (upserted_posts, removed_ids, sequence), or None when `since` is too old to replay."""
+        with self._lock:
+            if since > self._sequence:
+                return None
+            if since < self._sequence and (not self._changes or self._changes[0][0] > since + 1):
+                return None
+            # Sequences in the log are contiguous, so the first unseen change is at a fixed offset.
+            first_unseen = len(self._changes) - (self._sequence - since)
+            touched = dict.fromkeys(doc_id for _, doc_id, _ in itertools.islice(self._changes, first_unseen, None))
+            upserted = [dict(self._posts[doc_id]) for doc_id in touched if doc_id in self._posts]
+            removed = [doc_id for doc_id in touched if doc_id not in self._posts]
+            return upserted, removed, self._sequence
+
+    def __len__(self):
+        with self._lock:
+            return len(self._posts)
+
+
+pending_index = PendingPostsIndex()
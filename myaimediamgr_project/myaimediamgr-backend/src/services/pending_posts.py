@@ -0,0 +1,65 @@
+import json
+import base64
+from datetime import datetime
+
+PENDING_POSTS_COLLECTION = 'pending_posts'
+PENDING_PAGE_SIZE_DEFAULT = 50
+PENDING_PAGE_SIZE_MAX = 200
+
+# Fields a client may request with `fields=`; `id` is always included.
+PENDING_POST_FIELDS = (
+    'user_id', 'text', 'media_url', 'media_gcs_uri', 'media_type', 'platforms', 'status', 'created_at'
+)
+
+
+class InvalidCursor(ValueError):
+    """The pagination cursor could not be decoded."""
+
+
+def encode_cursor(created_at, doc_id):
+    payload = json.dumps([created_at.isoformat() if created_at else None, doc_id])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return (datetime.fromisoformat(created_at) if created_at else None), str(doc_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def parse_fields(fields_param):
+    """Turns `fields=a,b` into the requested field tuple, or None for all fields."""
+    if not fields_param:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in fields_param.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PENDING_POST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def build_pending_query(firestore_client, limit, cursor=None, user_id=None, platform=None, fields=None):
+    """Builds the keyset-paginated pending-posts query.
+
+    Results are ordered by (created_at, document id), so `cursor` resumes
+    strictly after the last post of the previous page. One extra document is
+    requested so the caller can tell whether another page exists. The
+    composite indexes this needs are declared in firestore.indexes.json.
+    """
+    collection = firestore_client.collection(PENDING_POSTS_COLLECTION)
+    query = collection.where('status', '==', 'pending')
+    if user_id is not None:
+        query = query.where('user_id', '==', user_id)
+    if platform:
+        query = query.where('platforms', 'array_contains', platform)
+    query = query.order_by('created_at').order_by('__name__')
+    if fields is not None:
+        # created_at is always read because the next cursor is built from it.
+        query = query.select(list(dict.fromkeys(fields + ('created_at', 'media_gcs_uri'))))
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        query = query.start_after({'created_at': created_at, '__name__': doc_id})
+    return query.limit(limit + 1)
@@ -0,0 +1,60 @@
+import os
+import fcntl
+import logging
+import tempfile
+import threading
+
+# Where PeriodicJob keeps the lock files that elect one owner per job and machine.
+PERIODIC_JOB_LOCK_DIR = os.getenv('PERIODIC_JOB_LOCK_DIR', tempfile.gettempdir())
+
+
+class PeriodicJob:
+    """Runs `job()` inside an app context every `interval` seconds on a daemon thread.
+
+    With `single_owner` set, every process may start the job but only the one
+    holding an exclusive lock on `<PERIODIC_JOB_LOCK_DIR>/<name>.lock` runs it.
+    The others keep trying each interval and take over if the owner exits.
+    """
+
+    def __init__(self, app, job, interval, name, single_owner=False):
+        self.app = app
+        self.job = job
+        self.interval = interval
+        self.name = name
+        self.single_owner = single_owner
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _is_owner(self):
+        if not self.single_owner or self._lock_file is not None:
+            return True
+        lock_file = open(os.path.join(PERIODIC_JOB_LOCK_DIR, f"{self.name}.lock"), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # Held until the process exits, which releases the lock for the next owner.
+        self._lock_file = lock_file
+        logging.info(f"Periodic job '{self.name}' is owned by process {os.getpid()}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._is_owner():
+                    with self.app.app_context():
+                        self.job()
+            except Exception as e:
+                logging.error(f"Periodic job '{self.name}' failed: {e}", exc_info=True)
+            self._stop.wait(self.interval)
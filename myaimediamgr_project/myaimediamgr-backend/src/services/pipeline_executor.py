@@ -0,0 +1,26 @@
+import os
+from concurrent.futures import wait, FIRST_EXCEPTION
+from src.services.metrics import InstrumentedThreadPoolExecutor
+
+# Shared pool for the independent network calls inside one generation
+# (uploads, signing, captioning). Tasks on this pool must not submit to it.
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '16'))
+
+pipeline_executor = InstrumentedThreadPoolExecutor('pipeline', PIPELINE_WORKERS, thread_name_prefix='pipeline')
+
+
+def run_concurrently(*calls):
+    """Runs each `(fn, *args)` call on the shared pool and returns results in order.
+
+    The first exception is re-raised as soon as it happens; calls that have not
+    started yet are cancelled. Calls already running cannot be interrupted and
+    finish in the background with their results discarded.
+    """
+    futures = [pipeline_executor.submit(fn, *args) for fn, *args in calls]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for future in futures:
+        if future in done and future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+    return [future.result() for future in futures]
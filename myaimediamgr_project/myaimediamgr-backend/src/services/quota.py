@@ -0,0 +1,114 @@
+import logging
+from sqlalchemy import update, case, or_
+from src.database import db
+from src.models.user import User
+from src.services.metrics import stage_timer
+
+# Content types map onto the quota columns of User.
+QUOTA_COLUMNS = {
+    'image': 'image_quota',
+    'video': 'video_v2_quota',
+    'video_v2': 'video_v2_quota',
+    'video_v3': 'video_v3_quota',
+    'text': 'text_quota'
+}
+
+
+class QuotaError(Exception):
+    """Base class for quota reservation failures."""
+
+
+class QuotaExceeded(QuotaError):
+    """The user does not have enough credits left for the reservation."""
+
+
+class QuotaUserNotFound(QuotaError):
+    """The reservation referenced a user that does not exist."""
+
+
+def quota_column(content_type):
+    quota_attr = QUOTA_COLUMNS.get(content_type)
+    if not quota_attr:
+        raise QuotaError("Invalid content type for quota check")
+    return getattr(User, quota_attr)
+
+
+class QuotaReservation:
+    """Credits taken from a user's quota that can later be kept or handed back.
+
+    The credits are already deducted in the database when the reservation is
+    created; `commit()` keeps them and `refund()` returns some or all of them.
+    """
+
+    def __init__(self, user_id, content_type, amount, unlimited=False):
+        self.user_id = user_id
+        self.content_type = content_type
+        self.amount = amount
+        self.unlimited = unlimited
+        self.refunded = 0
+        self.committed = False
+
+    @property
+    def outstanding(self):
+        return 0 if self.committed else self.amount - self.refunded
+
+    def commit(self):
+        self.committed = True
+
+    def refund(self, amount=None):
+        """Returns `amount` (default: everything still outstanding) credits in one UPDATE."""
+        amount = self.outstanding if amount is None else min(amount, self.outstanding)
+        if amount <= 0:
+            return 0
+        self.refunded += amount
+        if self.unlimited:
+            return amount
+        column = quota_column(self.content_type)
+        db.session.execute(
+            update(User).where(User.id == self.user_id).values({column: column + amount})
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        logging.info(f"Refunded {amount} {self.content_type} credit(s) to user {self.user_id}")
+        return amount
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.refund()
+        return False
+
+
+def reserve_quota(user_id, content_type, amount=1):
+    """Atomically deducts `amount` credits and returns a QuotaReservation.
+
+    A single conditional `UPDATE ... SET q = q - n WHERE id = ? AND q >= n`
+    does the check and the decrement together, so concurrent requests cannot
+    both pass the check on any backend. Admins match the WHERE clause without
+    being decremented.
+    """
+    column = quota_column(content_type)
+    is_admin = User.role == 'admin'
+    with stage_timer('quota_reserve'):
+        result = db.session.execute(
+            update(User)
+            .where(User.id == user_id, or_(is_admin, column >= amount))
+            .values({column: case((is_admin, column), else_=column - amount)})
+            .returning(User.role)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        db.session.commit()
+
+    if row is None:
+        if db.session.query(User.id).filter_by(id=user_id).first() is None:
+            raise QuotaUserNotFound("User not found")
+        if amount == 1:
+            raise QuotaExceeded(f"No {content_type} credits remaining.")
+        raise QuotaExceeded(f"Not enough {content_type} credits remaining for {amount} items.")
+
+    return QuotaReservation(user_id, content_type, amount, unlimited=row.role == 'admin')
@@ -0,0 +1,113 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update, case, and_, or_
+from src.database import db
+from src.models.user import User
+from src.services.periodic import PeriodicJob
+from src.routes.subscription import (
+    SUBSCRIPTION_PLANS, QUOTA_ALLOCATION_COLUMNS, DEFAULT_QUOTA_ALLOCATION, quota_allocation
+)
+
+# --- Configuration ---
+QUOTA_RESET_CHUNK_SIZE = int(os.getenv('QUOTA_RESET_CHUNK_SIZE', '1000'))
+QUOTA_RESET_PERIOD_DAYS = 30
+QUOTA_RESET_SCHEDULER_ENABLED = os.getenv('QUOTA_RESET_SCHEDULER', 'false').lower() in ('1', 'true', 'yes')
+QUOTA_RESET_INTERVAL_SECONDS = int(os.getenv('QUOTA_RESET_INTERVAL_SECONDS', '3600'))
+
+
+def _refill_condition(now):
+    """True for users whose trial or subscription is still running at `now` (the test access_flags uses)."""
+    return or_(
+        and_(User.subscription_status == 'trialing', User.trial_end_date > now),
+        and_(User.subscription_status == 'active', User.subscription_end_date > now)
+    )
+
+
+def _allocation_values(next_reset, refill):
+    """SET clause moving the reset date forward and, where `refill` holds, restoring every quota column from the tier."""
+    values = {'quota_reset_date': next_reset}
+    for column in QUOTA_ALLOCATION_COLUMNS:
+        allocation = case(
+            {tier: quota_allocation(tier)[column] for tier in SUBSCRIPTION_PLANS},
+            value=User.subscription_tier,
+            else_=DEFAULT_QUOTA_ALLOCATION[column]
+        )
+        values[column] = case((refill, allocation), else_=getattr(User, column))
+    return values
+
+
+def reset_due_quotas(now=None, chunk_size=QUOTA_RESET_CHUNK_SIZE):
+    """Moves every passed quota_reset_date forward and refills the users whose access is still running.
+
+    Due ids are read a chunk at a time in quota_reset_date order, which walks
+    the quota_reset_date index, and each chunk is reset by one UPDATE and
+    committed on its own. The UPDATE repeats the `quota_reset_date <= now`
+    condition and moves the date past `now` for every due row, so finished
+    rows drop out of the next chunk's query. Only trials and subscriptions
+    whose end date is still ahead are refilled; lapsed and canceled accounts
+    keep what they have but also move on, so they are not scanned again
+    until their next period. An interrupted run can simply be started again,
+    and concurrent runs (several workers or instances) never reset a user twice.
+    """
+    now = now or datetime.utcnow()
+    refill = _refill_condition(now)
+    values = _allocation_values(now + timedelta(days=QUOTA_RESET_PERIOD_DAYS), refill)
+    started = time.perf_counter()
+    rows = refilled = chunks = 0
+    while True:
+        due = db.session.execute(
+            select(User.id, refill)
+            .where(User.quota_reset_date <= now)
+            .order_by(User.quota_reset_date)
+            .limit(chunk_size)
+        ).all()
+        if not due:
+            break
+        result = db.session.execute(
+            update(User)
+            .where(User.id.in_([row[0] for row in due]), User.quota_reset_date <= now)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        chunks += 1
+        if not result.rowcount:
+            # Another run moved these rows between our SELECT and UPDATE; it will finish them.
+            break
+        rows += result.rowcount
+        refilled += sum(1 for row in due if row[1])
+
+    elapsed = time.perf_counter() - started
+    report = {
+        'rows': rows,
+        'refilled': refilled,
+        'chunks': chunks,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed else None
+    }
+    logging.info(
+        f"Quota reset: {rows} users ({refilled} refilled) in {chunks} chunks, "
+        f"{elapsed:.2f}s ({report['rows_per_second']} rows/s)"
+    )
+    return report
+
+
+def start_quota_reset_scheduler(app, interval=QUOTA_RESET_INTERVAL_SECONDS):
+    """Started by the gunicorn workers (see gunicorn.conf.py); only one of them resets at a time."""
+    return PeriodicJob(app, reset_due_quotas, interval, 'quota-reset', single_owner=True).start()
+
+
+@click.command('reset-quotas')
+@click.option('--chunk-size', default=QUOTA_RESET_CHUNK_SIZE, show_default=True, help='Users reset per UPDATE.')
+@with_appcontext
+def reset_quotas_command(chunk_size):
+    """Reset the quotas of users whose quota_reset_date has passed."""
+    report = reset_due_quotas(chunk_size=chunk_size)
+    click.echo(
+        f"Reset {report['rows']} users ({report['refilled']} refilled) in {report['chunks']} chunks "
+        f"({report['seconds']}s, {report['rows_per_second']} rows/s)"
+    )
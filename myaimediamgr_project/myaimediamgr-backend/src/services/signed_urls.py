@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, unquote
+
+# --- Configuration ---
+SIGNED_URL_TTL_SECONDS = int(os.getenv('SIGNED_URL_TTL_SECONDS', str(15 * 60)))
+SIGNED_URL_REFRESH_MARGIN_SECONDS = int(os.getenv('SIGNED_URL_REFRESH_MARGIN_SECONDS', '120'))
+SIGNED_URL_CACHE_MAX_ENTRIES = int(os.getenv('SIGNED_URL_CACHE_MAX_ENTRIES', '4096'))
+# The only bucket the service signs URLs for; its account can read others it must not hand out.
+MEDIA_BUCKET = os.getenv('MEDIA_BUCKET', 'final-myaimediamgr-website-media')
+
+GCS_PUBLIC_HOSTS = ('storage.googleapis.com', 'storage.cloud.google.com')
+
+
+def is_media_bucket_uri(uri, bucket=MEDIA_BUCKET):
+    prefix = f"gs://{bucket}/"
+    return bool(uri) and uri.startswith(prefix) and len(uri) > len(prefix)
+
+
+def gcs_uri_from_url(url, bucket=MEDIA_BUCKET):
+    """Recovers `gs://bucket/object` from a gs:// URI or a GCS (signed) HTTPS URL.
+
+    Only objects in `bucket` are recognised; anything else gives None.
+    """
+    if not url:
+        return None
+    uri = None
+    if url.startswith('gs://'):
+        uri = url
+    else:
+        parts = urlsplit(url)
+        if parts.hostname in GCS_PUBLIC_HOSTS:
+            path = unquote(parts.path.lstrip('/'))
+            if '/' in path:
+                uri = f"gs://{path}"
+        elif parts.hostname and parts.hostname.endswith('.storage.googleapis.com'):
+            host_bucket = parts.hostname[:-len('.storage.googleapis.com')]
+            uri = f"gs://{host_bucket}/{unquote(parts.path.lstrip('/'))}"
+    return uri if is_media_bucket_uri(uri, bucket) else None
+
+
+class UnsignableUri(ValueError):
+    """Raised for URIs outside the storage the service is allowed to sign for."""
+
+
+class SignedUrlCache:
+    """Reuses signed URLs until shortly before they expire.
+
+    `signer(uri, expires_at)` must return a URL valid until the `expires_at`
+    epoch timestamp, or raise; failures are never cached. URIs for which
+    `accepts(uri)` is false (by default: outside MEDIA_BUCKET) raise
+    UnsignableUri without reaching the signer.
+    """
+
+    def __init__(self, signer, accepts=is_media_bucket_uri, ttl_seconds=SIGNED_URL_TTL_SECONDS,
+                 refresh_margin_seconds=SIGNED_URL_REFRESH_MARGIN_SECONDS,
+                 max_entries=SIGNED_URL_CACHE_MAX_ENTRIES):
+        self._signer = signer
+        self._accepts = accepts
+        self._ttl_seconds = ttl_seconds
+        self._refresh_margin_seconds = min(refresh_margin_seconds, ttl_seconds // 2)
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def sign(self, uri):
+        if not self._accepts(uri):
+            raise UnsignableUri(f"Refusing to sign {uri}")
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(uri)
+            if cached and cached[1] - self._refresh_margin_seconds > now:
+                self._entries.move_to_end(uri)
+                self._hits += 1
+                return cached[0]
+            self._misses += 1
+
+        expires_at = now + self._ttl_seconds
+        url = self._signer(uri, expires_at)
+        with self._lock:
+            self._entries[uri] = (url, expires_at)
+            self._entries.move_to_end(uri)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return url
+
+    def sign_many(self, uris):
+        """Signs each distinct URI once and returns a {uri: url} mapping."""
+        return {uri: self.sign(uri) for uri in dict.fromkeys(uris)}
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses, 'entries': len(self._entries)}
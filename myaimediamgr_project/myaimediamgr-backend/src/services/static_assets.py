@@ -0,0 +1,123 @@
+import os
+import re
+import gzip
+import time
+import hashlib
+import logging
+import mimetypes
+from flask import Response, request, send_file
+
+# --- Configuration ---
+STATIC_PRECOMPRESS = os.getenv('STATIC_PRECOMPRESS', 'true').lower() in ('1', 'true', 'yes')
+# Vite names bundle files `<name>-<content hash>.<ext>`.
+HASHED_ASSET_PATTERN = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[a-z0-9]+$')
+COMPRESSIBLE_EXTENSIONS = ('.js', '.mjs', '.css', '.html', '.json', '.svg', '.txt', '.map', '.xml', '.ico')
+MIN_COMPRESS_BYTES = 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+ENCODINGS = ('gzip',)
+PRECOMPRESSED_SUFFIXES = {'.gz': 'gzip'}
+
+
+class StaticAsset:
+    """One file of the static folder with its validators and compressed variants."""
+
+    def __init__(self, path, mimetype, etag, cache_control):
+        self.path = path
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        # encoding -> compressed bytes
+        self.variants = {}
+
+
+class StaticManifest:
+    """In-memory index of the static folder, built once at startup.
+
+    Requests are answered from a dictionary lookup instead of probing the
+    filesystem. Compressible files get a gzip variant, taken from a `.gz`
+    file produced by the frontend build when present and otherwise
+    compressed here; the variant is kept only if it is smaller.
+    Content-hashed bundle files are marked immutable, everything else
+    (index.html in particular) is revalidated through its ETag.
+    """
+
+    def __init__(self, root, index_name='index.html', precompress=STATIC_PRECOMPRESS):
+        self.root = root
+        self.index_name = index_name
+        self.precompress = precompress
+        self.assets = {}
+
+    @property
+    def index(self):
+        return self.assets.get(self.index_name)
+
+    def build(self):
+        started = time.perf_counter()
+        assets = {}
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                base, suffix = os.path.splitext(key)
+                if suffix in PRECOMPRESSED_SUFFIXES and os.path.exists(os.path.join(self.root, base)):
+                    continue
+                assets[key] = self._load(key, path)
+        self.assets = assets
+
+        compressed = sum(len(data) for asset in assets.values() for data in asset.variants.values())
+        logging.info(
+            f"Indexed {len(assets)} static files ({compressed / 1024:.0f} KiB of compressed variants) "
+            f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return self
+
+    def _load(self, key, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        immutable = HASHED_ASSET_PATTERN.match(key)
+        asset = StaticAsset(
+            path, mimetype, hashlib.sha1(data).hexdigest(),
+            IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        )
+        if len(data) >= MIN_COMPRESS_BYTES and path.endswith(COMPRESSIBLE_EXTENSIONS):
+            for encoding in ENCODINGS:
+                variant = self._variant(path, data, encoding)
+                if variant is not None and len(variant) < len(data):
+                    asset.variants[encoding] = variant
+        return asset
+
+    def _variant(self, path, data, encoding):
+        prebuilt = path + '.gz'
+        if os.path.exists(prebuilt):
+            with open(prebuilt, 'rb') as f:
+                return f.read()
+        if not self.precompress:
+            return None
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+    def lookup(self, path):
+        """Returns the asset for a request path, falling back to index.html for SPA routes."""
+        return self.assets.get(path) or self.index
+
+    def respond(self, asset):
+        encoding = 'identity'
+        if asset.variants:
+            encoding = request.accept_encodings.best_match(list(asset.variants) + ['identity'], default='identity')
+        etag = asset.etag if encoding == 'identity' else f"{asset.etag}-{encoding}"
+
+        if request.if_none_match and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif encoding == 'identity':
+            # send_file handles Range requests and uses the server's file wrapper (sendfile) when available.
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=False, conditional=True, max_age=None)
+        else:
+            response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
@@ -0,0 +1,283 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+
+# --- Configuration ---
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+# Line-delimited OTLP/JSON (one ExportTraceServiceRequest per line), readable by
+# the OpenTelemetry collector's otlpjson file receiver. Export is off unless a path is set.
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH', '')
+# Once the file reaches this size it is rotated to `<path>.1`, replacing the previous one.
+TRACE_EXPORT_MAX_BYTES = int(os.getenv('TRACE_EXPORT_MAX_BYTES', str(50 * 1024 * 1024)))
+TRACE_ID_HEADER = 'X-Trace-Id'
+SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'myaimediamgr-backend')
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = ContextVar('current_span', default=None)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+class FileExporter:
+    """Appends finished traces to a local file as OTLP/JSON lines.
+
+    The file is rotated at `max_bytes`, so at most about twice that is kept on
+    disk (which is memory on Cloud Run).
+    """
+
+    def __init__(self, path, max_bytes=TRACE_EXPORT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [_attribute('service.name', SERVICE_NAME)]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span.to_otlp() for span in spans]}]
+        }]}, separators=(',', ':'))
+        try:
+            with self._lock:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            logging.warning(f"Could not export trace to {self.path}: {e}")
+
+
+exporter = FileExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None
+
+
+class _TraceBuffer:
+    """Collects the spans of one trace and exports them once none is open."""
+
+    def __init__(self):
+        self.spans = []
+        self.open = 0
+        self.lock = threading.Lock()
+
+    def opened(self):
+        with self.lock:
+            self.open += 1
+
+    def closed(self, span):
+        with self.lock:
+            self.spans.append(span)
+            self.open -= 1
+            if self.open:
+                return
+            spans, self.spans = self.spans, []
+        # Work that outlives the request (async jobs) is exported as a later batch of the same trace.
+        if exporter is not None:
+            exporter.export(spans)
+
+
+class Span:
+    def __init__(self, name, trace_id, parent, sampled, buffer, kind=SPAN_KIND_INTERNAL, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._buffer = buffer
+        if sampled:
+            buffer.opened()
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add_event(self, name, **attributes):
+        if self.sampled:
+            self.events.append((time.time_ns(), name, attributes))
+
+    def record_exception(self, exception):
+        self.status = (STATUS_ERROR, f"{type(exception).__name__}: {exception}")
+        self.add_event('exception', **{'exception.type': type(exception).__name__, 'exception.message': str(exception)})
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                self._buffer.closed(self)
+
+    def to_otlp(self):
+        data = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            'events': [
+                {'timeUnixNano': str(at), 'name': name, 'attributes': [_attribute(k, v) for k, v in attrs.items()]}
+                for at, name, attrs in self.events
+            ],
+            'status': {'code': self.status[0], 'message': self.status[1]} if self.status else {'code': STATUS_OK}
+        }
+        if self.parent_id:
+            data['parentSpanId'] = self.parent_id
+        return data
+
+
+def current_span():
+    return _current_span.get()
+
+
+def current_trace_id():
+    current = _current_span.get()
+    return current.trace_id if current is not None else None
+
+
+def start_trace(name, trace_id=None, sampled=None, parent_span_id=None, kind=SPAN_KIND_SERVER, **attributes):
+    """Starts and activates a root span; returns (span, token) for end_trace()."""
+    if sampled is None:
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    root = Span(name, trace_id or '%032x' % random.getrandbits(128), None, sampled, _TraceBuffer(), kind, attributes)
+    root.parent_id = parent_span_id
+    return root, _current_span.set(root)
+
+
+def end_trace(root, token, exception=None):
+    if exception is not None:
+        root.record_exception(exception)
+    root.end()
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Ended from a different context than it was started in (e.g. a streamed body).
+        _current_span.set(None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Child span of the current one; a no-op (yielding None) when the trace is not sampled."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    child = Span(name, parent.trace_id, parent, True, parent._buffer, attributes=attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def tag(**attributes):
+    """Sets attributes on the current span, if the request is being traced."""
+    current = _current_span.get()
+    if current is not None and current.sampled:
+        current.set_attributes(**attributes)
+
+
+def propagate(fn):
+    """Binds the caller's current span to `fn`, for running it on another thread."""
+    parent = _current_span.get()
+    if parent is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return wrapper
+
+
+# --- Flask integration ---
+
+def _parse_traceparent(header):
+    """Returns (trace_id, parent_span_id, sampled) from a W3C traceparent header, or None."""
+    parts = (header or '').split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        return parts[1].lower(), parts[2].lower(), bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+
+
+def _start_request_trace():
+    incoming = _parse_traceparent(request.headers.get('traceparent'))
+    # The caller's sampled flag is ignored: clients could otherwise force every request to be
+    # recorded. Sampling is decided here at TRACE_SAMPLE_RATE; only the ids are continued.
+    trace_id, parent_span_id, _ = incoming or (request.headers.get(TRACE_ID_HEADER), None, None)
+    if trace_id and (len(trace_id) != 32 or not all(c in '0123456789abcdef' for c in trace_id)):
+        trace_id = None
+    route = request.url_rule.rule if request.url_rule else request.path
+    g._trace = start_trace(
+        f"{request.method} {route}", trace_id=trace_id, parent_span_id=parent_span_id,
+        **{'http.method': request.method, 'http.route': route, 'http.target': request.full_path}
+    )
+
+
+def _add_trace_header(response):
+    trace = g.get('_trace')
+    if trace is not None:
+        root = trace[0]
+        response.headers[TRACE_ID_HEADER] = root.trace_id
+        root.set_attributes(**{'http.status_code': response.status_code})
+        identity = g.get('identity')
+        if identity is not None:
+            root.set_attributes(**{'user.id': identity.user_id})
+        if response.status_code >= 500 and root.status is None:
+            root.status = (STATUS_ERROR, f"HTTP {response.status_code}")
+    return response
+
+
+def _end_request_trace(exception):
+    trace = g.pop('_trace', None)
+    if trace is not None:
+        end_trace(*trace, exception=exception)
+
+
+def init_tracing(app):
+    """Traces every request; the root span ends at teardown, after any streamed body."""
+    app.before_request(_start_request_trace)
+    app.after_request(_add_trace_header)
+    app.teardown_request(_end_request_trace)
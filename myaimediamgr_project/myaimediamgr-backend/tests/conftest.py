@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import `src` and `benchmarks` from the backend root, like gunicorn does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# src.main reads its configuration at import time; keep it hermetic and quiet.
+for name, value in (('DATABASE_URL', 'sqlite://'), ('AUTH_TOKEN_SECRET', 'test-only-secret'),
+                    ('WARM_CLIENTS', 'false'), ('WARM_MODELS', 'false'), ('RATELIMIT_ENABLED', 'false'),
+                    ('TRACE_SAMPLE_RATE', '0'), ('TRACE_EXPORT_PATH', ''), ('MEDIA_STORAGE_BACKEND', 'gcs')):
+    os.environ.setdefault(name, value)
+os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+
+
+@pytest.fixture(scope='session')
+def db_app():
+    """A bare Flask app on a throwaway SQLite file, for tests of the database services."""
+    from flask import Flask
+    from src.database import db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+@pytest.fixture
+def db_session(db_app):
+    from src.database import db
+
+    with db_app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db.session
+        db.session.remove()
+
+
+@pytest.fixture(scope='session')
+def app():
+    """src.main with the Google Cloud clients and models replaced by the benchmark fakes."""
+    from src.main import app
+    from benchmarks.fakes import FakeConfig, install_fakes
+
+    config = FakeConfig(image_latency_ms=0, caption_latency_ms=0, video_latency_ms=0, upload_latency_ms=0,
+                        sign_latency_ms=0, firestore_latency_ms=0)
+    install_fakes(config)
+    return app
@@ -0,0 +1,152 @@
+import time
+
+import pytest
+from google.api_core import exceptions
+
+from src.services import admission
+from src.services.metrics import ADMISSION_THROTTLED
+from src.services.admission import ModelAdmission, AdmissionRejected, BREAKER_CLOSED, BREAKER_OPEN
+
+
+def model(**options):
+    settings = dict(rpm=0, max_concurrency=8, max_wait=0.2, breaker_threshold=3, breaker_cooldown=0.05)
+    settings.update(options)
+    return ModelAdmission('test-model', **settings)
+
+
+def throttle(controller):
+    with pytest.raises(exceptions.ResourceExhausted):
+        with controller.admit():
+            raise exceptions.ResourceExhausted('quota exceeded')
+
+
+def fail(controller):
+    with pytest.raises(ValueError):
+        with controller.admit():
+            raise ValueError('unexpected')
+
+
+def succeed(controller):
+    with controller.admit():
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_decrease_window(monkeypatch):
+    # Let every throttle halve the limit instead of one per second.
+    monkeypatch.setattr(admission, 'ADMISSION_DECREASE_WINDOW_SECONDS', 0)
+
+
+def test_throttles_halve_the_limit_and_successes_grow_it_back():
+    controller = model(breaker_threshold=100)
+    throttle(controller)
+    assert controller.stats()['concurrency_limit'] == 4
+    throttle(controller)
+    assert controller.stats()['concurrency_limit'] == 2
+
+    succeed(controller)
+    assert controller.stats()['concurrency_limit'] == 2.5
+    for _ in range(100):
+        succeed(controller)
+    assert controller.stats()['concurrency_limit'] == 8
+
+
+def test_limit_never_drops_below_one():
+    controller = model(breaker_threshold=100)
+    for _ in range(10):
+        throttle(controller)
+    assert controller.stats()['concurrency_limit'] == 1
+
+
+def test_burst_of_throttles_halves_once_per_window(monkeypatch):
+    monkeypatch.setattr(admission, 'ADMISSION_DECREASE_WINDOW_SECONDS', 60)
+    controller = model(breaker_threshold=100)
+    throttle(controller)
+    throttle(controller)
+    assert controller.stats()['concurrency_limit'] == 4
+
+
+def test_other_errors_leave_the_limit_alone():
+    controller = model()
+    throttle(controller)
+    fail(controller)
+    assert controller.stats()['concurrency_limit'] == 4
+
+
+def test_throttles_are_counted_per_model_but_other_errors_are_not():
+    counter = ADMISSION_THROTTLED.labels('test-model')
+    before = counter._value.get()
+    controller = model()
+    throttle(controller)
+    throttle(controller)
+    fail(controller)
+    succeed(controller)
+    assert counter._value.get() - before == 2
+
+
+def test_breaker_opens_after_consecutive_throttles_and_rejects():
+    controller = model()
+    for _ in range(3):
+        throttle(controller)
+    assert controller.stats()['breaker'] == BREAKER_OPEN
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        succeed(controller)
+    assert rejected.value.reason == 'breaker_open'
+    assert rejected.value.retry_after >= 1
+
+
+def test_success_resets_the_throttle_streak():
+    controller = model()
+    throttle(controller)
+    throttle(controller)
+    succeed(controller)
+    throttle(controller)
+    assert controller.stats()['breaker'] == BREAKER_CLOSED
+
+
+def test_successful_probe_closes_the_breaker():
+    controller = model()
+    for _ in range(3):
+        throttle(controller)
+    time.sleep(0.06)
+    succeed(controller)
+    assert controller.stats()['breaker'] == BREAKER_CLOSED
+
+
+@pytest.mark.parametrize('outcome', [throttle, fail])
+def test_failed_probe_reopens_the_breaker(outcome):
+    controller = model()
+    for _ in range(3):
+        throttle(controller)
+    time.sleep(0.06)
+    outcome(controller)
+    assert controller.stats()['breaker'] == BREAKER_OPEN
+    with pytest.raises(AdmissionRejected):
+        succeed(controller)
+
+
+def test_only_one_probe_while_half_open():
+    controller = model()
+    for _ in range(3):
+        throttle(controller)
+    time.sleep(0.06)
+    with controller.admit():
+        with pytest.raises(AdmissionRejected):
+            succeed(controller)
+
+
+def test_concurrency_limit_rejects_after_max_wait():
+    controller = model(max_concurrency=1, max_wait=0.05)
+    with controller.admit():
+        with pytest.raises(AdmissionRejected) as rejected:
+            succeed(controller)
+    assert rejected.value.reason == 'concurrency'
+
+
+def test_token_bucket_rejects_when_no_token_is_due_in_time():
+    controller = model(rpm=60, max_concurrency=4, burst=1, max_wait=0.1)
+    succeed(controller)
+    with pytest.raises(AdmissionRejected) as rejected:
+        succeed(controller)
+    assert rejected.value.reason == 'rate'
@@ -0,0 +1,91 @@
+import time
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from src.services import auth_tokens
+from src.services.auth_tokens import init_auth_tokens, issue_token, verify_token, TokenError
+
+
+@pytest.fixture
+def token_app(monkeypatch):
+    monkeypatch.setenv('AUTH_TOKEN_SECRET', 'unit-test-secret')
+    app = Flask(__name__)
+    init_auth_tokens(app)
+    with app.app_context():
+        yield app
+
+
+def make_user(**overrides):
+    fields = dict(id=7, role='user', subscription_tier='pro', subscription_status='active',
+                  trial_end_date=None, subscription_end_date=datetime.utcnow() + timedelta(days=30))
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def test_issued_token_verifies_with_its_claims(token_app):
+    identity = verify_token(issue_token(make_user()))
+    assert identity.user_id == 7
+    assert identity.role == 'user'
+    assert identity.tier == 'pro'
+    assert identity.has_access()
+
+
+def test_access_expiry_is_carried_in_the_token(token_app):
+    identity = verify_token(issue_token(make_user(subscription_status='canceled')))
+    assert identity.access_expires_at is None
+    assert not identity.has_access()
+
+
+def test_tampered_payload_is_rejected(token_app):
+    body, signature = issue_token(make_user()).split('.')
+    forged = issue_token(make_user(id=1, role='admin')).split('.')[0]
+    with pytest.raises(TokenError, match='signature'):
+        verify_token(f"{forged}.{signature}")
+    with pytest.raises(TokenError, match='signature'):
+        verify_token(f"{body}.{signature[:-2]}xx")
+
+
+def test_non_ascii_token_is_rejected(token_app):
+    with pytest.raises(TokenError, match='Malformed'):
+        verify_token('\xe9.\xe9')
+
+
+def test_non_ascii_bearer_token_does_not_break_requests(app):
+    # The identity hook runs before every route; a garbage header must only leave the request anonymous.
+    response = app.test_client().get('/healthz', headers={'Authorization': 'Bearer \xe9.\xe9'})
+    assert response.status_code == 200
+
+
+def test_token_signed_with_another_secret_is_rejected(token_app):
+    token = issue_token(make_user())
+    token_app.config['AUTH_TOKEN_SECRET'] = 'rotated-secret'
+    with pytest.raises(TokenError):
+        verify_token(token)
+
+
+def test_expired_token_is_rejected(token_app):
+    token = issue_token(make_user(), now=time.time() - auth_tokens.AUTH_TOKEN_TTL_SECONDS - 1)
+    with pytest.raises(TokenError, match='expired'):
+        verify_token(token)
+
+
+def test_version_bump_revokes_tokens(token_app, monkeypatch):
+    token = issue_token(make_user())
+    monkeypatch.setattr(auth_tokens, 'AUTH_TOKEN_VERSION', auth_tokens.AUTH_TOKEN_VERSION + 1)
+    with pytest.raises(TokenError, match='revoked'):
+        verify_token(token)
+
+
+@pytest.mark.parametrize('token', ['', 'no-dot', 'a.b.c', None])
+def test_malformed_tokens_are_rejected(token_app, token):
+    with pytest.raises(TokenError):
+        verify_token(token)
+
+
+def test_app_refuses_to_start_without_a_secret(monkeypatch):
+    monkeypatch.delenv('AUTH_TOKEN_SECRET', raising=False)
+    with pytest.raises(RuntimeError, match='AUTH_TOKEN_SECRET'):
+        init_auth_tokens(Flask(__name__))
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+from src.database import db
+from src.models.user import User
+from src.services.generation_jobs import GenerationJobQueue, QueueFullError
+from src.services.quota import reserve_quota
+
+
+def wait_until_finished(queue, job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.is_finished() and time.monotonic() < deadline:
+        queue.wait_for_update(job.id, job.version, deadline - time.monotonic())
+    assert job.is_finished()
+    return job
+
+
+def test_failed_job_refunds_its_reservation(db_app, db_session):
+    user = User(username='jobs', email='jobs@example.com', image_quota=5)
+    db_session.add(user)
+    db_session.commit()
+    reservation = reserve_quota(user.id, 'image')
+
+    def work():
+        raise RuntimeError('model unavailable')
+
+    queue = GenerationJobQueue(max_workers=1)
+    job = queue.submit(db_app, user.id, 'image', work, on_failure=lambda job: reservation.refund())
+    wait_until_finished(queue, job)
+
+    assert job.status == 'failed'
+    assert job.error == 'model unavailable'
+    db.session.expire_all()
+    assert db.session.get(User, user.id).image_quota == 5
+
+
+def test_successful_job_keeps_its_result(db_app):
+    queue = GenerationJobQueue(max_workers=1)
+    job = wait_until_finished(queue, queue.submit(db_app, 1, 'text', lambda: {'text': 'hello'}))
+
+    assert job.status == 'succeeded'
+    assert job.to_dict()['result'] == {'text': 'hello'}
+
+
+def test_full_queue_rejects_new_jobs_until_one_finishes(db_app):
+    release = threading.Event()
+    queue = GenerationJobQueue(max_workers=1, max_pending=2)
+    first = queue.submit(db_app, 1, 'image', release.wait)
+    queue.submit(db_app, 1, 'image', release.wait)
+
+    with pytest.raises(QueueFullError):
+        queue.submit(db_app, 1, 'image', release.wait)
+
+    release.set()
+    wait_until_finished(queue, first)
+    queue.submit(db_app, 1, 'image', release.wait)
+
+
+def test_get_only_returns_jobs_to_their_owner(db_app):
+    queue = GenerationJobQueue(max_workers=1)
+    job = wait_until_finished(queue, queue.submit(db_app, 7, 'text', lambda: None))
+
+    assert queue.get(job.id, 7) is job
+    assert queue.get(job.id, '7') is job
+    assert queue.get(job.id, 8) is None
+    assert queue.get(job.id, None) is None
+    assert queue.get('missing', 7) is None
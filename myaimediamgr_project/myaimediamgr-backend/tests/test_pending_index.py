@@ -0,0 +1,91 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fakes import FakeConfig, FakeFirestoreClient
+from src.services.pending_index import PendingPostsIndex
+from src.services.pending_posts import PENDING_POSTS_COLLECTION
+
+STARTED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def pending_post(index, status='pending'):
+    return {'user_id': 1, 'text': f"post {index}", 'platforms': ['instagram'], 'status': status,
+            'created_at': STARTED + timedelta(seconds=index)}
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("condition not met in time")
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def collection():
+    collection = FakeFirestoreClient(FakeConfig(firestore_latency_ms=0)).collection(PENDING_POSTS_COLLECTION)
+    for index in range(3):
+        collection.put(f"post{index}", pending_post(index))
+    return collection
+
+
+@pytest.fixture
+def index(collection):
+    index = PendingPostsIndex(enabled=True, retry_seconds=0)
+    index.ensure_started(lambda: collection.where('status', '==', 'pending'))
+    wait_until(index.is_ready)
+    yield index
+    index.stop()
+
+
+def test_initial_snapshot_is_paged_in_order(index):
+    posts, next_cursor, _ = index.page(2)
+    assert [post['id'] for post in posts] == ['post0', 'post1']
+    posts, next_cursor, _ = index.page(2, cursor=next_cursor)
+    assert [post['id'] for post in posts] == ['post2']
+    assert next_cursor is None
+
+
+def test_changes_since_reports_upserts_and_removals(index, collection):
+    _, _, since = index.page(10)
+    collection.put('post3', pending_post(3))
+    collection.put('post0', pending_post(0, status='approved'))
+    index._watch.flush()
+
+    upserted, removed, sequence = index.changes_since(since)
+    assert [post['id'] for post in upserted] == ['post3']
+    assert removed == ['post0']
+    assert sequence == since + 2
+
+
+def test_dead_listener_is_replaced_and_clients_reset(index, collection):
+    _, _, since = index.page(10)
+    index._watch.close()
+    assert not index.is_ready()
+
+    # Changes made while the stream was down are picked up by the new listener's first snapshot.
+    collection.put('post1', pending_post(1, status='approved'))
+    collection.put('post4', pending_post(4))
+    index.ensure_started(lambda: collection.where('status', '==', 'pending'))
+    wait_until(index.is_ready)
+
+    posts, _, _ = index.page(10)
+    assert [post['id'] for post in posts] == ['post0', 'post2', 'post4']
+    assert index.changes_since(since) is None
+
+
+def test_failed_subscribe_leaves_index_not_ready(collection):
+    index = PendingPostsIndex(enabled=True, retry_seconds=60)
+
+    def broken_query():
+        raise RuntimeError('watch unavailable')
+
+    index.ensure_started(broken_query)
+    assert not index.is_ready()
+
+    # The retry interval has not passed, so the next request does not try again.
+    index.ensure_started(lambda: collection.where('status', '==', 'pending'))
+    assert not index.is_ready()
+    assert index._watch is None
@@ -0,0 +1,28 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.services.pending_posts import encode_cursor, decode_cursor, InvalidCursor
+
+
+def test_cursor_round_trips_timestamp_and_id():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, 'post00000042')
+    assert decode_cursor(cursor) == (created_at, 'post00000042')
+
+
+def test_cursor_is_url_safe_without_padding():
+    cursor = encode_cursor(datetime(2024, 5, 1, tzinfo=timezone.utc), 'a/b+c')
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor)[1] == 'a/b+c'
+
+
+def test_cursor_without_timestamp():
+    # Posts whose server timestamp has not resolved yet have no created_at.
+    assert decode_cursor(encode_cursor(None, 'post1')) == (None, 'post1')
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'e30', '!!!', encode_cursor(None, 'x')[:-3]])
+def test_invalid_cursors_raise(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from src.database import db
+from src.models.user import User
+from src.services.quota import reserve_quota, QuotaExceeded, QuotaUserNotFound
+
+
+def make_user(db_session, role='user', image_quota=5):
+    user = User(username=f"{role}-{image_quota}", email=f"{role}-{image_quota}@example.com", role=role,
+                image_quota=image_quota)
+    db_session.add(user)
+    db_session.commit()
+    return user.id
+
+
+def image_quota(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id).image_quota
+
+
+def test_reserve_deducts_and_refund_returns_credits(db_session):
+    user_id = make_user(db_session)
+    reservation = reserve_quota(user_id, 'image', amount=3)
+    assert image_quota(user_id) == 2
+
+    assert reservation.refund(1) == 1
+    assert image_quota(user_id) == 3
+    # Refunds never exceed what is still outstanding.
+    assert reservation.refund() == 2
+    assert reservation.refund() == 0
+    assert image_quota(user_id) == 5
+
+
+def test_committed_reservation_is_not_refunded(db_session):
+    user_id = make_user(db_session)
+    with reserve_quota(user_id, 'image') as reservation:
+        pass
+    assert reservation.committed
+    assert reservation.refund() == 0
+    assert image_quota(user_id) == 4
+
+
+def test_context_manager_refunds_on_error(db_session):
+    user_id = make_user(db_session)
+    with pytest.raises(RuntimeError):
+        with reserve_quota(user_id, 'image'):
+            raise RuntimeError('generation failed')
+    assert image_quota(user_id) == 5
+
+
+def test_reservation_beyond_quota_is_refused_without_deducting(db_session):
+    user_id = make_user(db_session, image_quota=2)
+    with pytest.raises(QuotaExceeded):
+        reserve_quota(user_id, 'image', amount=3)
+    assert image_quota(user_id) == 2
+
+
+def test_unknown_user_is_reported(db_session):
+    with pytest.raises(QuotaUserNotFound):
+        reserve_quota(12345, 'image')
+
+
+def test_admins_are_not_charged(db_session):
+    user_id = make_user(db_session, role='admin', image_quota=0)
+    reservation = reserve_quota(user_id, 'image', amount=10)
+    assert reservation.unlimited
+    assert reservation.refund() == 10
+    assert image_quota(user_id) == 0
+
+
+def test_concurrent_reservations_never_overdraw(db_app, db_session):
+    user_id = make_user(db_session, image_quota=5)
+    requests = 20
+    barrier = threading.Barrier(requests)
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker():
+        with db_app.app_context():
+            barrier.wait()
+            try:
+                reserve_quota(user_id, 'image')
+                outcome = 'reserved'
+            except QuotaExceeded:
+                outcome = 'exceeded'
+            finally:
+                db.session.remove()
+            with lock:
+                outcomes.append(outcome)
+
+    threads = [threading.Thread(target=worker) for _ in range(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes.count('reserved') == 5
+    assert outcomes.count('exceeded') == requests - 5
+    assert image_quota(user_id) == 0
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from src.database import db
+from src.models.user import User
+from src.services.quota_reset import reset_due_quotas, QUOTA_RESET_PERIOD_DAYS
+
+NOW = datetime(2026, 1, 1)
+
+
+def make_user(db_session, name, status, tier='pro', trial_end=None, subscription_end=None, due=True):
+    user = User(username=name, email=f"{name}@example.com", subscription_tier=tier, subscription_status=status,
+                trial_end_date=trial_end, subscription_end_date=subscription_end, image_quota=0,
+                quota_reset_date=NOW - timedelta(days=1) if due else NOW + timedelta(days=1))
+    db_session.add(user)
+    db_session.commit()
+    return user.id
+
+
+def load(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id)
+
+
+def test_running_trials_and_subscriptions_are_refilled(db_session):
+    trial = make_user(db_session, 'trial', 'trialing', tier='trial', trial_end=NOW + timedelta(days=3))
+    active = make_user(db_session, 'active', 'active', subscription_end=NOW + timedelta(days=10))
+
+    report = reset_due_quotas(now=NOW, chunk_size=1)
+
+    assert report['rows'] == 2 and report['refilled'] == 2
+    assert load(trial).image_quota == 100
+    assert load(active).image_quota == 300
+    assert load(active).quota_reset_date == NOW + timedelta(days=QUOTA_RESET_PERIOD_DAYS)
+
+
+def test_lapsed_accounts_are_not_refilled_but_move_on(db_session):
+    lapsed = [
+        make_user(db_session, 'expired-trial', 'trialing', trial_end=NOW - timedelta(days=1)),
+        make_user(db_session, 'lapsed-active', 'active', subscription_end=NOW - timedelta(days=1)),
+        make_user(db_session, 'open-ended', 'active'),
+        make_user(db_session, 'canceled', 'canceled', subscription_end=NOW + timedelta(days=10)),
+    ]
+
+    report = reset_due_quotas(now=NOW)
+
+    assert report['rows'] == 4 and report['refilled'] == 0
+    for user_id in lapsed:
+        user = load(user_id)
+        assert user.image_quota == 0
+        assert user.quota_reset_date > NOW
+    # Nothing is due any more, so a second run scans no rows.
+    assert reset_due_quotas(now=NOW)['rows'] == 0
+
+
+def test_users_not_yet_due_are_untouched(db_session):
+    user_id = make_user(db_session, 'later', 'active', subscription_end=NOW + timedelta(days=10), due=False)
+
+    assert reset_due_quotas(now=NOW)['rows'] == 0
+    assert load(user_id).image_quota == 0
@@ -0,0 +1,53 @@
+import pytest
+
+from src.services.signed_urls import (
+    MEDIA_BUCKET, SignedUrlCache, UnsignableUri, gcs_uri_from_url, is_media_bucket_uri
+)
+
+MEDIA_URI = f"gs://{MEDIA_BUCKET}/generated-media/image-1.png"
+
+
+def test_only_media_bucket_uris_are_accepted():
+    assert is_media_bucket_uri(MEDIA_URI)
+    assert not is_media_bucket_uri(f"gs://{MEDIA_BUCKET}/")
+    assert not is_media_bucket_uri(f"gs://{MEDIA_BUCKET}-private/secret.png")
+    assert not is_media_bucket_uri('gs://other-bucket/generated-media/image-1.png')
+    assert not is_media_bucket_uri(None)
+
+
+@pytest.mark.parametrize('url, expected', [
+    (MEDIA_URI, MEDIA_URI),
+    (f"https://storage.googleapis.com/{MEDIA_BUCKET}/generated-media/image-1.png?X-Goog-Signature=abc", MEDIA_URI),
+    (f"https://{MEDIA_BUCKET}.storage.googleapis.com/generated-media/image-1.png", MEDIA_URI),
+    ('https://storage.googleapis.com/other-bucket/generated-media/image-1.png', None),
+    ('gs://other-bucket/generated-media/image-1.png', None),
+    (f"https://evil.example.com/{MEDIA_BUCKET}/generated-media/image-1.png", None),
+    ('', None),
+])
+def test_urls_are_mapped_back_only_for_the_media_bucket(url, expected):
+    assert gcs_uri_from_url(url) == expected
+
+
+def test_cache_refuses_foreign_uris_without_calling_the_signer():
+    calls = []
+    cache = SignedUrlCache(lambda uri, expires_at: calls.append(uri) or f"https://signed/{uri}")
+    with pytest.raises(UnsignableUri):
+        cache.sign('gs://other-bucket/secret.png')
+    assert calls == []
+
+
+def test_cache_reuses_unexpired_signatures():
+    calls = []
+    cache = SignedUrlCache(lambda uri, expires_at: calls.append(uri) or f"https://signed/{len(calls)}")
+    assert cache.sign(MEDIA_URI) == cache.sign(MEDIA_URI) == 'https://signed/1'
+    assert calls == [MEDIA_URI]
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_sign_route_returns_null_for_uris_outside_the_media_bucket(app):
+    foreign = 'gs://other-bucket/generated-media/image-1.png'
+    response = app.test_client().post('/api/content/media/sign', json={'uris': [MEDIA_URI, foreign]})
+    assert response.status_code == 200
+    signed = response.get_json()['data']
+    assert signed[MEDIA_URI].startswith(f"https://storage.fake.local/{MEDIA_BUCKET}/generated-media/image-1.png")
+    assert signed[foreign] is None